@@ -0,0 +1,57 @@
+"""Summarize fortio results read from stdin and check them against the thresholds.
+
+Run on the master node with the thresholds as JSON argument. Prints the summary as JSON and exits
+with an error if a threshold is violated, which fails the results command of the update.
+"""
+
+import json
+import re
+import sys
+
+
+def summarize(output: str) -> dict:
+    # the JSON document starts with the first line consisting of an opening brace:
+    match = re.search(r'^\{$', output, flags=re.MULTILINE)
+    if not match:
+        sys.exit(f'no fortio results found in output: {output[-500:]}')
+    results = json.loads(output[match.start() :])
+
+    histogram = results['DurationHistogram']
+    requests = histogram['Count']
+    ok = results.get('RetCodes', {}).get('200', 0)
+    return {
+        'requests': requests,
+        'requests_per_second': round(results['ActualQPS'], 1),
+        'error_ratio': round((requests - ok) / requests, 4) if requests else 1.0,
+        **{
+            f'p{percentile["Percentile"]:g}_ms': round(percentile['Value'] * 1000, 2)
+            for percentile in histogram.get('Percentiles', [])
+        },
+    }
+
+
+def check_thresholds(thresholds: dict, summary: dict) -> list[str]:
+    violations = [
+        f'{key} is {summary[key]}, at most {thresholds[f"max_{key}"]} allowed'
+        for key in ('p50_ms', 'p95_ms', 'p99_ms', 'error_ratio')
+        if thresholds.get(f'max_{key}') is not None
+        and summary.get(key, 0) > thresholds[f'max_{key}']
+    ]
+    minimum = thresholds.get('min_requests_per_second')
+    if minimum is not None and summary['requests_per_second'] < minimum:
+        violations.append(
+            f'requests_per_second is {summary["requests_per_second"]}, at least {minimum} required'
+        )
+    return violations
+
+
+def main():
+    summary = summarize(sys.stdin.read())
+    print(json.dumps(summary))
+
+    if violations := check_thresholds(json.loads(sys.argv[1]), summary):
+        sys.exit(f'ingress load test failed: {"; ".join(violations)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""Benchmark of building the resource graph of the stack, without any cloud access.
+
+Runs `create_microk8s` against Pulumi mocks for clusters of different sizes, based on the
+configuration of the given stack, and reports wall time, peak memory and resource counts:
+
+    uv run scripts/benchmark.py --baseline benchmarks/baseline.json --output benchmarks/current.json
+"""
+
+import argparse
+import collections
+import contextlib
+import functools
+import hashlib
+import ipaddress
+import json
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+
+import jinja2
+import pulumi as p
+import pulumi_proxmoxve as proxmoxve
+import pydantic
+import yaml
+
+from kubernetes import charts, microk8s, templates
+from kubernetes.model import ComponentConfig, EnvVarRef
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent
+
+DEFAULT_NODE_COUNTS = (1, 10, 50, 200)
+
+# functions timed individually, by label:
+TIMED_FUNCTIONS = {
+    'node': (microk8s, '_create_node'),
+    'render': (jinja2.Template, 'render'),
+    'k8s_provider': (microk8s, 'create_k8s_provider'),
+}
+
+
+class BenchmarkMocks(p.runtime.Mocks):
+    def __init__(self):
+        self.resources: collections.Counter[str] = collections.Counter()
+
+    @typing.override
+    def new_resource(self, args: p.runtime.MockResourceArgs) -> tuple[str, dict]:
+        self.resources[args.typ] += 1
+        outputs = dict(args.inputs)
+
+        match args.typ:
+            case 'proxmoxve:VM/virtualMachine:VirtualMachine':
+                address = args.inputs['initialization']['ipConfigs'][0]['ipv4']['address']
+                outputs['ipv4Addresses'] = [['127.0.0.1'], [address.split('/')[0]]]
+            case 'command:remote:Command':
+                outputs['stdout'] = ''
+            case 'kubernetes:core/v1:Service':
+                outputs['status'] = {'loadBalancer': {'ingress': [{'ip': '127.0.0.1'}]}}
+            case _:
+                pass
+
+        return f'{args.name}-id', outputs
+
+    # the SDK takes a plain dict, a tuple needs a list of failures despite its annotation:
+    @typing.override
+    def call(self, args: p.runtime.MockCallArgs) -> dict:  # pyright: ignore[reportIncompatibleMethodOverride]
+        # no existing VMs, nodes or datastores:
+        return {}
+
+
+class Timings:
+    def __init__(self):
+        self.seconds: collections.defaultdict[str, float] = collections.defaultdict(float)
+
+    @contextlib.contextmanager
+    def patch(self, label: str, owner: typing.Any, name: str):
+        original = getattr(owner, name)
+
+        @functools.wraps(original)
+        def timed(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.seconds[label] += time.perf_counter() - start
+
+        setattr(owner, name, timed)
+        try:
+            yield
+        finally:
+            setattr(owner, name, original)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--stack', default='dev', help='stack to take the base config from')
+    parser.add_argument('--nodes', type=int, nargs='+', default=DEFAULT_NODE_COUNTS)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per size, best is reported')
+    parser.add_argument('--output', type=pathlib.Path, help='write results as JSON')
+    parser.add_argument('--baseline', type=pathlib.Path, help='compare with earlier results')
+    args = parser.parse_args()
+
+    base_config = yaml.safe_load((ROOT_DIR / f'Pulumi.{args.stack}.yaml').read_text())['config'][
+        'kubernetes:config'
+    ]
+
+    results = [
+        min(
+            (_run(_scale_config(base_config, node_count)) for _ in range(args.repeat)),
+            key=lambda result: result['wall_time_s'],
+        )
+        for node_count in args.nodes
+    ]
+
+    baseline = (
+        {result['nodes']: result for result in json.loads(args.baseline.read_text())['results']}
+        if args.baseline
+        else {}
+    )
+    _print_table(results, baseline)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(
+            json.dumps({'python': sys.version.split()[0], 'results': results}, indent=2) + '\n'
+        )
+
+
+def _scale_config(base_config: dict[str, typing.Any], node_count: int) -> ComponentConfig:
+    """Return the base config with the given number of nodes, HA masters from three nodes on."""
+    config = json.loads(json.dumps(base_config))
+    microk8s_config = config['microk8s']
+    master = microk8s_config['master-nodes'][0]
+    master_ipv4 = ipaddress.IPv4Interface(master['ipv4-address'])
+    # large enough network for all sizes:
+    network = ipaddress.IPv4Network((master_ipv4.ip, 16), strict=False)
+
+    master_count = 3 if node_count >= 3 else 1
+    microk8s_config['master-nodes'] = [
+        master
+        | {
+            'name': f'bench-master-{index}',
+            'vmid': master['vmid'] + index,
+            'ipv4-address': str(ipaddress.IPv4Interface((master_ipv4.ip + index, 16))),
+        }
+        for index in range(master_count)
+    ]
+    if master_count > 1:
+        microk8s_config['high-availability'] = {'api-vip': str(network.network_address + 10)}
+
+    microk8s_config['worker-pools'] = [
+        {
+            'name': 'bench-worker',
+            'count': node_count - master_count,
+            'vmid-start': master['vmid'] + 100,
+            'ipv4-address-start': str(ipaddress.IPv4Interface((network.network_address + 256, 16))),
+            **{
+                key: value
+                for key, value in master.items()
+                if key not in {'name', 'vmid', 'ipv4-address', 'ipv4_address'}
+            },
+        }
+    ]
+
+    return ComponentConfig.model_validate(config)
+
+
+def _run(component_config: ComponentConfig) -> dict[str, typing.Any]:
+    mocks = BenchmarkMocks()
+    timings = Timings()
+
+    for envvar_ref in _envvar_refs(component_config):
+        os.environ.setdefault(envvar_ref.envvar, 'benchmark')
+    os.environ.setdefault('UNIFY_API_TOKEN__PULUMI', 'benchmark')
+
+    with tempfile.TemporaryDirectory() as work_dir, contextlib.chdir(work_dir):
+        # run in an empty directory, so that no stack state files or chart downloads are used:
+        pathlib.Path('assets').symlink_to(ROOT_DIR / 'assets')
+        _seed_chart_cache(component_config)
+        templates.load_template.cache_clear()
+
+        p.runtime.set_mocks(mocks, project='kubernetes', stack='benchmark', preview=True)
+
+        with contextlib.ExitStack() as stack:
+            for label, (owner, name) in TIMED_FUNCTIONS.items():
+                stack.enter_context(timings.patch(label, owner, name))
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            p.runtime.test(_program)(component_config)
+            wall_time_s = time.perf_counter() - start
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    node_count = len(component_config.microk8s.nodes)
+    return {
+        'nodes': node_count,
+        'wall_time_s': round(wall_time_s, 4),
+        'wall_time_per_node_ms': round(wall_time_s / node_count * 1000, 3),
+        'peak_memory_mb': round(peak_memory / 1024**2, 2),
+        'resources': sum(mocks.resources.values()),
+        'providers': sum(
+            count for typ, count in mocks.resources.items() if typ.startswith('pulumi:providers:')
+        ),
+        'timings_s': {label: round(seconds, 4) for label, seconds in timings.seconds.items()},
+        'resources_by_type': dict(sorted(mocks.resources.items())),
+    }
+
+
+def _program(component_config: ComponentConfig):
+    proxmox_provider = proxmoxve.Provider(
+        'provider',
+        endpoint=str(component_config.proxmox.api_endpoint),
+        api_token=component_config.proxmox.api_token.value,
+    )
+    microk8s.create_microk8s(component_config, proxmox_provider)
+
+
+def _envvar_refs(value: typing.Any) -> list[EnvVarRef]:
+    if isinstance(value, EnvVarRef):
+        return [value]
+    if isinstance(value, pydantic.BaseModel):
+        value = [getattr(value, name) for name in type(value).model_fields]
+    elif isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return [envvar_ref for item in value for envvar_ref in _envvar_refs(item)]
+    return []
+
+
+def _seed_chart_cache(component_config: ComponentConfig):
+    for name, chart_config in (
+        ('metallb', component_config.metallb),
+        ('cert-manager', component_config.cert_manager),
+        ('traefik', component_config.traefik),
+        ('csi-driver-smb', component_config.csi_driver_smb),
+        ('metrics-server', component_config.metrics_server),
+        ('prometheus', component_config.monitoring),
+        ('topolvm', component_config.local_pv),
+        (
+            'snapshot-controller',
+            component_config.local_pv and component_config.local_pv.snapshot_controller,
+        ),
+    ):
+        if not chart_config:
+            continue
+        path = charts.CHART_CACHE_DIR / f'{name}-{chart_config.version}.tgz'
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b'')
+        path.with_suffix('.tgz.sha256').write_text(hashlib.sha256(b'').hexdigest())
+
+
+def _print_table(results: list[dict[str, typing.Any]], baseline: dict[int, dict[str, typing.Any]]):
+    columns = ('nodes', 'wall_time_s', 'wall_time_per_node_ms', 'peak_memory_mb', 'resources')
+    print(' '.join(f'{column:>22}' for column in columns))
+    for result in results:
+        cells = []
+        for column in columns:
+            cell = str(result[column])
+            if (previous := baseline.get(result['nodes'])) and column != 'nodes':
+                change = (result[column] / previous[column] - 1) * 100 if previous[column] else 0
+                cell = f'{cell} ({change:+.0f}%)'
+            cells.append(f'{cell:>22}')
+        print(' '.join(cells))
+
+    if len(results) > 1:
+        per_node = [result['wall_time_per_node_ms'] for result in results]
+        print(f'\nwall time per node: median {statistics.median(per_node):.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Deployment of a stack with a timing report per resource and of the critical path.
+
+Runs `pulumi up` via the Automation API, records the engine events of each resource and rebuilds
+the dependency graph from the resulting state to find the chain of resources that determined the
+total duration:
+
+    uv run scripts/deploy_report.py --stack dev --json deploy-report.json
+
+Use `--from-json` to print the report of an earlier deployment again.
+"""
+
+import argparse
+import dataclasses
+import json
+import pathlib
+import threading
+import time
+import typing
+
+from pulumi import automation
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent
+
+
+@dataclasses.dataclass
+class ResourceTiming:
+    urn: str
+    type: str
+    ops: list[str] = dataclasses.field(default_factory=list)
+    # seconds since start of the deployment:
+    start_s: float | None = None
+    end_s: float | None = None
+    failed: bool = False
+
+    @property
+    def name(self) -> str:
+        return self.urn.rsplit('::', 1)[-1]
+
+    @property
+    def duration_s(self) -> float:
+        if self.start_s is None or self.end_s is None:
+            return 0.0
+        return self.end_s - self.start_s
+
+
+class EventRecorder:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.events: list[dict[str, typing.Any]] = []
+        self.timings: dict[str, ResourceTiming] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: automation.EngineEvent):
+        # the engine timestamps have a resolution of seconds only, so take the time of receipt:
+        now = round(time.monotonic() - self.started, 3)
+
+        for kind, step_event in (
+            ('pre', event.resource_pre_event),
+            ('outputs', event.res_outputs_event),
+            ('failed', event.res_op_failed_event),
+        ):
+            if not step_event or getattr(step_event, 'planning', False):
+                continue
+
+            metadata = step_event.metadata
+            with self._lock:
+                self.events.append(
+                    {
+                        'sequence': event.sequence,
+                        'time_s': now,
+                        'kind': kind,
+                        'urn': metadata.urn,
+                        'op': metadata.op.value,
+                    }
+                )
+
+                timing = self.timings.setdefault(
+                    metadata.urn, ResourceTiming(urn=metadata.urn, type=metadata.type)
+                )
+                if kind == 'pre':
+                    timing.ops.append(metadata.op.value)
+                    if timing.start_s is None:
+                        timing.start_s = now
+                else:
+                    timing.end_s = now
+                    timing.failed |= kind == 'failed'
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--stack', default='dev')
+    parser.add_argument('--json', type=pathlib.Path, help='write report as JSON')
+    parser.add_argument('--from-json', type=pathlib.Path, help='report on an earlier deployment')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest resources shown')
+    args = parser.parse_args()
+
+    if args.from_json:
+        report = json.loads(args.from_json.read_text())
+    else:
+        report = _deploy(args.stack)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + '\n')
+
+    timings = {
+        resource['urn']: ResourceTiming(**resource) for resource in report['resources'].values()
+    }
+    _print_table(
+        f'Critical path of {report["stack"]} ({report["duration_s"]:.0f}s in total)',
+        [timings[urn] for urn in report['critical_path']],
+        timings=timings,
+        dependencies=report['dependencies'],
+    )
+    _print_table(
+        f'Slowest {args.top} resources',
+        sorted(timings.values(), key=lambda timing: timing.duration_s, reverse=True)[: args.top],
+        timings=timings,
+        dependencies=report['dependencies'],
+    )
+
+
+def _deploy(stack_name: str) -> dict[str, typing.Any]:
+    stack = automation.select_stack(stack_name=stack_name, work_dir=str(ROOT_DIR))
+    recorder = EventRecorder()
+
+    try:
+        result = stack.up(on_event=recorder, on_output=print)
+        status = result.summary.result
+    except automation.CommandError as error:
+        # still report on the resources processed up to the failure:
+        print(error)
+        status = 'failed'
+
+    duration_s = round(time.monotonic() - recorder.started, 3)
+    dependencies = _get_dependencies(stack)
+    timings = recorder.timings
+
+    return {
+        'stack': stack_name,
+        'status': status,
+        'duration_s': duration_s,
+        'resources': {urn: dataclasses.asdict(timing) for urn, timing in timings.items()},
+        'dependencies': {urn: deps for urn, deps in dependencies.items() if urn in timings},
+        'critical_path': _critical_path(timings, dependencies),
+        'events': recorder.events,
+    }
+
+
+def _get_dependencies(stack: automation.Stack) -> dict[str, list[str]]:
+    dependencies: dict[str, list[str]] = {}
+    deployment = stack.export_stack().deployment or {}
+    for resource in deployment.get('resources', []):
+        urns = set(resource.get('dependencies', []))
+        for property_urns in resource.get('propertyDependencies', {}).values():
+            urns.update(property_urns)
+        # resources also wait for their provider and parent:
+        if provider := resource.get('provider'):
+            urns.add(provider.rsplit('::', 1)[0])
+        if parent := resource.get('parent'):
+            urns.add(parent)
+        dependencies[resource['urn']] = sorted(urns)
+    return dependencies
+
+
+def _critical_path(
+    timings: dict[str, ResourceTiming], dependencies: dict[str, list[str]]
+) -> list[str]:
+    """Return the chain of resources that gated each other, ending with the last one finished.
+
+    Starting with the resource finished last, the path follows the dependency finished last,
+    as that one was the last to unblock the resource.
+    """
+    finished = {urn: timing for urn, timing in timings.items() if timing.end_s is not None}
+    if not finished:
+        return []
+
+    current = max(finished.values(), key=lambda timing: timing.end_s or 0)
+    path = [current.urn]
+    while predecessors := [
+        finished[urn]
+        for urn in dependencies.get(current.urn, [])
+        if urn in finished and urn not in path
+    ]:
+        current = max(predecessors, key=lambda timing: timing.end_s or 0)
+        path.append(current.urn)
+
+    return path[::-1]
+
+
+def _print_table(
+    title: str,
+    rows: list[ResourceTiming],
+    *,
+    timings: dict[str, ResourceTiming],
+    dependencies: dict[str, list[str]],
+):
+    print(f'\n{title}:')
+    print(f'{"start":>8} {"duration":>9} {"gap":>8}  {"op":<20} {"type":<45} name')
+    for timing in rows:
+        # time between the last dependency finishing and the resource starting:
+        dependency_ends = [
+            end_s
+            for urn in dependencies.get(timing.urn, [])
+            if urn in timings and (end_s := timings[urn].end_s) is not None
+        ]
+        gap = (
+            f'{timing.start_s - max(dependency_ends):7.1f}s'
+            if dependency_ends and timing.start_s is not None
+            else ''
+        )
+        start = f'{timing.start_s:7.1f}s' if timing.start_s is not None else ''
+        op = ','.join(timing.ops) + (' FAILED' if timing.failed else '')
+        print(
+            f'{start:>8} {timing.duration_s:8.1f}s {gap:>8}  {op:<20} {timing.type:<45}'
+            f' {timing.name}'
+        )
+
+
+if __name__ == '__main__':
+    main()
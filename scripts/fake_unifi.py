@@ -0,0 +1,76 @@
+"""Local fake of the UniFi static DNS API for trying out DNS record syncs.
+
+Run with `python scripts/fake_unifi.py [port]` and point `unify.url` to `http://localhost:<port>`.
+Every request is logged, so the number of API round trips of a sync can be checked.
+"""
+
+import http.server
+import json
+import sys
+import uuid
+
+STATIC_DNS_PATH = '/proxy/network/v2/api/site/default/static-dns'
+API_TOKEN_HEADER = 'X-API-KEY'
+
+records: dict[str, dict] = {}
+
+
+class FakeUnifiHandler(http.server.BaseHTTPRequestHandler):
+    # keep connections alive like the real controller:
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self._check(with_id=False):
+            self._reply(200, list(records.values()))
+
+    def do_POST(self):
+        if self._check(with_id=False):
+            record = self._body() | {'_id': uuid.uuid4().hex}
+            records[record['_id']] = record
+            self._reply(200, record)
+
+    def do_PUT(self):
+        if record_id := self._check(with_id=True):
+            records[record_id] = self._body() | {'_id': record_id}
+            self._reply(200, records[record_id])
+
+    def do_DELETE(self):
+        if record_id := self._check(with_id=True):
+            del records[record_id]
+            self._reply(200, {})
+
+    def _check(self, *, with_id: bool) -> str | None:
+        if not self.headers.get(API_TOKEN_HEADER):
+            self._reply(401, {'error': 'missing API key'})
+            return None
+
+        path, _, record_id = self.path.rstrip('/').rpartition('/')
+        if not with_id and self.path.rstrip('/') == STATIC_DNS_PATH:
+            return 'zone'
+        if with_id and path == STATIC_DNS_PATH and record_id in records:
+            return record_id
+
+        self._reply(404, {'error': f'not found: {self.path}'})
+        return None
+
+    def _body(self) -> dict:
+        return json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+
+    def _reply(self, status: int, body: dict | list):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8443
+    server = http.server.ThreadingHTTPServer(('localhost', port), FakeUnifiHandler)
+    print(f'Fake UniFi API listening on http://localhost:{port}{STATIC_DNS_PATH}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
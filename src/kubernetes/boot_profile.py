@@ -0,0 +1,115 @@
+"""Boot profiles of nodes, collected after cloud-init has finished."""
+
+import itertools
+import re
+import typing
+
+import pulumi as p
+import pulumi_command as command
+import pulumi_proxmoxve as proxmoxve
+
+from kubernetes.model import ComponentConfig
+from kubernetes.sections import SECTION_MARKER, split_sections
+
+# number of slowest cloud-init modules and systemd units kept per node:
+TOP_ENTRIES = 10
+
+DURATION_PATTERN = re.compile(r'(?:(\d+)min)?\s*(?:([\d.]+)s)?\s*(?:([\d.]+)ms)?')
+
+
+def collect_boot_profile(
+    component_config: ComponentConfig,
+    node_name: str,
+    *,
+    node_vm: proxmoxve.vm.VirtualMachine,
+    node_ipv4: p.Output[str],
+) -> p.Output[dict[str, typing.Any]]:
+    boot_profile = command.remote.Command(
+        f'{node_name}-boot-profile',
+        connection=command.remote.ConnectionArgs(
+            host=node_ipv4,
+            user=component_config.microk8s.ssh_user,
+        ),
+        add_previous_output_in_env=False,
+        create='; '.join(
+            (
+                'cloud-init status --wait > /dev/null',
+                f'echo "{SECTION_MARKER}steps"',
+                'cat /var/log/boot-steps.log 2> /dev/null',
+                f'echo "{SECTION_MARKER}cloud-init"',
+                'sudo cloud-init analyze blame',
+                f'echo "{SECTION_MARKER}systemd"',
+                'systemd-analyze',
+                f'echo "{SECTION_MARKER}units"',
+                'systemd-analyze blame --no-pager',
+                'true',
+            )
+        ),
+        logging=command.remote.Logging.STDERR,
+        # collect again whenever the VM was replaced:
+        triggers=[node_vm.id],
+    )
+
+    return boot_profile.stdout.apply(parse_boot_profile)
+
+
+def parse_boot_profile(output: str) -> dict[str, typing.Any]:
+    sections = {
+        name: [line.strip() for line in lines if line.strip()]
+        for name, lines in split_sections(output).items()
+    }
+
+    return {
+        'steps': _parse_steps(sections.get('steps', [])),
+        # e.g. "03.61700s (init-network/config-ssh)":
+        'cloud_init': _parse_blame(sections.get('cloud-init', []), pattern=r'([\d.]+s) \((.+)\)'),
+        'systemd': _parse_systemd(sections.get('systemd', [])),
+        # e.g. "1min 2.345s snap.microk8s.daemon-kubelite.service":
+        'units': _parse_blame(sections.get('units', []), pattern=r'(.+?) (\S+)'),
+    }
+
+
+def _parse_steps(lines: list[str]) -> list[dict[str, typing.Any]]:
+    # each marker starts a step, which ends with the next marker:
+    markers = [(float(uptime), name) for uptime, name in (line.split(' ', 1) for line in lines)]
+    return [
+        {
+            'name': name,
+            'start_s': round(start, 2),
+            'duration_s': round(end - start, 2),
+        }
+        for (start, name), (end, _) in itertools.pairwise(markers)
+    ]
+
+
+def _parse_blame(lines: list[str], *, pattern: str) -> list[dict[str, typing.Any]]:
+    entries = []
+    for line in lines:
+        if match := re.fullmatch(pattern, line):
+            duration, name = match.groups()
+            entries.append({'name': name, 'duration_s': _parse_duration(duration)})
+    return sorted(entries, key=lambda entry: entry['duration_s'], reverse=True)[:TOP_ENTRIES]
+
+
+def _parse_systemd(lines: list[str]) -> dict[str, float]:
+    # e.g. "Startup finished in 2.1s (kernel) + 10.5s (userspace) = 12.6s"
+    prefix = 'Startup finished in '
+    summary = next((line for line in lines if line.startswith(prefix)), None)
+    if not summary:
+        return {}
+
+    summary, _, total = summary.removeprefix(prefix).partition(' = ')
+    phases = {}
+    for part in summary.split(' + '):
+        duration, _, phase = part.partition(' (')
+        phases[phase.rstrip(')')] = _parse_duration(duration)
+    phases['total'] = _parse_duration(total)
+    return phases
+
+
+def _parse_duration(text: str) -> float:
+    match = DURATION_PATTERN.fullmatch(text.strip())
+    if not match:
+        return 0.0
+    minutes, seconds, milliseconds = (float(group or 0) for group in match.groups())
+    return round(minutes * 60 + seconds + milliseconds / 1000, 3)
@@ -3,15 +3,23 @@
 import pulumi as p
 import pulumi_kubernetes as k8s
 
-from kubernetes.model import ComponentConfig
+from kubernetes.charts import get_chart
+from kubernetes.components import ComponentContext
+from kubernetes.model import CertManagerConfig
+from kubernetes.scraping import get_scrape_annotations
+
+METRICS_PORT = 9402
 
 LETS_ENCRYPT_SERVER_PROD = 'https://acme-v02.api.letsencrypt.org/directory'
 LETS_ENCRYPT_SERVER_STAGING = 'https://acme-staging-v02.api.letsencrypt.org/directory'
 
 
-def ensure_cert_manager(
-    component_config: ComponentConfig, k8s_provider: k8s.Provider
-) -> p.Resource:
+def ensure_cert_manager(context: ComponentContext) -> p.Resource:
+    cert_manager_config = context.component_config.cert_manager
+    cloudflare_config = context.component_config.cloudflare
+    assert cert_manager_config and cloudflare_config, 'cert-manager not configured'
+    k8s_provider = context.k8s_provider
+
     ns = k8s.core.v1.Namespace(
         'cert-manager',
         metadata={
@@ -20,35 +28,35 @@ def ensure_cert_manager(
         opts=p.ResourceOptions(provider=k8s_provider),
     )
 
-    namespaced_k8s_provider = k8s.Provider(
-        'cert-manager-provider',
-        kubeconfig=k8s_provider.kubeconfig,  # pyright: ignore[reportAttributeAccessIssue]
-        namespace=ns.metadata['name'],
-    )
-    k8s_opts = p.ResourceOptions(provider=namespaced_k8s_provider)
+    k8s_opts = p.ResourceOptions(provider=k8s_provider)
 
     # use Release instead of Chart in order to have one resource instead many individual:
     cert_manager = k8s.helm.v3.Release(
         'cert-manager',
-        chart='cert-manager',
-        version=component_config.cert_manager.version,
-        repository_opts={'repo': 'https://charts.jetstack.io'},
+        chart=get_chart(
+            'cert-manager',
+            repo='https://charts.jetstack.io',
+            chart_config=cert_manager_config,
+        ),
+        namespace=ns.metadata.name,
         values={
             'crds': {'enabled': True},
+            'podAnnotations': get_scrape_annotations(context.component_config, METRICS_PORT),
         },
         opts=k8s_opts,
     )
 
     cloudflare_secret = k8s.core.v1.Secret(
         'cloudflare-api-token',
+        metadata={'namespace': ns.metadata.name},
         type='Opaque',
-        string_data={'api-token': component_config.cloudflare.api_token.value},
+        string_data={'api-token': cloudflare_config.api_token.value},
         opts=k8s_opts,
     )
 
     return _create_lets_encrypt_issuer(
         'lets-encrypt',
-        component_config=component_config,
+        cert_manager_config=cert_manager_config,
         server=LETS_ENCRYPT_SERVER_PROD,
         cloudflare_secret=cloudflare_secret,
         opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[cert_manager])),
@@ -58,7 +66,7 @@ def ensure_cert_manager(
 def _create_lets_encrypt_issuer(
     name: str,
     *,
-    component_config: ComponentConfig,
+    cert_manager_config: CertManagerConfig,
     server: str,
     cloudflare_secret: k8s.core.v1.Secret,
     opts: p.ResourceOptions,
@@ -71,7 +79,7 @@ def _create_lets_encrypt_issuer(
         spec={
             'acme': {
                 'server': server,
-                'email': component_config.cert_manager.acme_email,
+                'email': cert_manager_config.acme_email,
                 'privateKeySecretRef': {'name': f'{name}-private-key'},
                 'solvers': [
                     {
@@ -0,0 +1,65 @@
+"""Local cache of Helm chart archives, so previews and deploys do not hit chart repositories."""
+
+import hashlib
+import pathlib
+import urllib.parse
+import urllib.request
+
+import pulumi as p
+import yaml
+
+from kubernetes.model import HelmChartConfig
+
+CHART_CACHE_DIR = pathlib.Path('.chart-cache')
+
+
+def get_chart(name: str, *, repo: str, chart_config: HelmChartConfig) -> str:
+    """Return the path of the chart archive in the cache, fetching it once from the repository.
+
+    Archives are verified against the pinned digest of the chart config or, if there is none,
+    against the digest listed in the repository index when the archive was fetched.
+    """
+    path = CHART_CACHE_DIR / f'{name}-{chart_config.version}.tgz'
+    digest_path = path.with_suffix('.tgz.sha256')
+
+    if not path.exists():
+        url, index_digest = _find_chart(name, repo=repo, version=chart_config.version)
+        if chart_config.digest and chart_config.digest != index_digest:
+            raise ValueError(
+                f'digest of Helm chart {name} {chart_config.version} in {repo} does not match the'
+                ' pinned digest'
+            )
+
+        p.log.info(f'Fetching Helm chart {name} {chart_config.version} from {url}.')
+        with urllib.request.urlopen(url) as response:
+            data = response.read()
+        _verify(path, data, index_digest)
+
+        CHART_CACHE_DIR.mkdir(exist_ok=True)
+        # write via rename, so an interrupted run never leaves a truncated archive behind:
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        digest_path.write_text(f'{index_digest}\n')
+
+    expected_digest = chart_config.digest or digest_path.read_text().strip()
+    _verify(path, path.read_bytes(), expected_digest)
+    return str(path)
+
+
+def _find_chart(name: str, *, repo: str, version: str) -> tuple[str, str]:
+    index_url = f'{repo.rstrip("/")}/index.yaml'
+    with urllib.request.urlopen(index_url) as response:
+        index = yaml.safe_load(response)
+
+    for entry in index.get('entries', {}).get(name, []):
+        if entry['version'] == version:
+            # chart URLs in the index may be relative to the repository:
+            return urllib.parse.urljoin(index_url, entry['urls'][0]), entry['digest']
+
+    raise ValueError(f'Helm chart {name} {version} not found in {repo}')
+
+
+def _verify(path: pathlib.Path, data: bytes, digest: str):
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise ValueError(f'Helm chart archive {path} does not match digest {digest}')
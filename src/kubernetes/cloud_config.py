@@ -0,0 +1,116 @@
+"""Content-addressed cloud-init snippets and batched rollout of cloud-config changes."""
+
+import difflib
+import hashlib
+
+import pulumi as p
+import pulumi_proxmoxve as proxmoxve
+
+DEPLOYED_OUTPUT = 'cloud-config-deployed'
+
+
+def create_snippet(
+    resource_name: str,
+    *,
+    name: str,
+    node_name: str,
+    data: p.Input[str],
+    opts: p.ResourceOptions,
+) -> proxmoxve.storage.File:
+    # the file name changes with the content only, so an unchanged snippet never causes a diff
+    # and a changed one is created next to the old one before the VM is switched over:
+    file_name = p.Output.from_input(data).apply(
+        lambda data: f'cloud-config-{name}-{hashlib.sha256(data.encode()).hexdigest()[:16]}.yaml'
+    )
+    return proxmoxve.storage.File(
+        resource_name,
+        node_name=node_name,
+        datastore_id='local',
+        content_type='snippets',
+        source_raw={
+            'data': data,
+            'file_name': file_name,
+        },
+        opts=opts,
+    )
+
+
+class CloudConfigRollout:
+    """Rollout of changed cloud-configs to at most `batch_size` nodes per run.
+
+    The cloud-config rolled out last to each node is kept in a stack output, read back from the
+    last update of the stack and only written once the node has been updated successfully. Nodes
+    with changed cloud-config beyond the batch keep their deployed cloud-config until a later run.
+    """
+
+    def __init__(self, batch_size: int | None):
+        self.batch_size = batch_size
+        stack = p.StackReference(f'{p.get_organization()}/{p.get_project()}/{p.get_stack()}')
+        self.deployed = stack.get_output(DEPLOYED_OUTPUT).apply(lambda deployed: deployed or {})
+        self._rendered: dict[str, str] = {}
+        self._pending: dict[str, p.Output[bool]] = {}
+        self._rolled_out: dict[str, p.Output[str]] = {}
+
+    def resolve(self, name: str, rendered: str, *, frozen: bool = False) -> p.Output[str]:
+        """Return the cloud-config to deploy to the node in this run.
+
+        A changed cloud-config of a frozen node is not rolled out but fails the update.
+        """
+        # nodes resolved before take the places of the batch first:
+        previous_rendered = dict(self._rendered)
+        self._rendered[name] = rendered
+
+        def select(deployed: dict[str, str]) -> str:
+            data = deployed.get(name)
+            if data is None or data == rendered:
+                return rendered
+
+            if frozen:
+                # error diagnostics fail the update:
+                p.log.error(
+                    f'Not rolling out changed cloud-config to {name}, which would replace it:'
+                    f'\n{_diff(data, rendered)}'
+                )
+                return data
+
+            updated = sum(
+                1
+                for other, other_rendered in previous_rendered.items()
+                if deployed.get(other, other_rendered) != other_rendered
+            )
+            if self.batch_size is None or updated < self.batch_size:
+                p.log.info(f'Rolling out changed cloud-config to {name}:\n{_diff(data, rendered)}')
+                return rendered
+
+            p.log.info(f'Deferring changed cloud-config of {name} to a later batch.')
+            return data
+
+        data = self.deployed.apply(select)
+        self._pending[name] = data.apply(lambda data: data != rendered)
+        return data
+
+    def record(self, name: str, data: p.Output[str], node: p.CustomResource):
+        """Store the cloud-config as rolled out, once the node's update has succeeded."""
+        # outputs of a failed resource never resolve, so a failed update keeps the previous stack
+        # output and the node is rolled out again in the next run:
+        self._rolled_out[name] = p.Output.all(node.id, data).apply(lambda args: args[1])
+
+    def finish(self):
+        p.export(DEPLOYED_OUTPUT, p.Output.all(**self._rolled_out))
+        p.export(
+            'cloud-config-pending',
+            p.Output.all(**self._pending).apply(
+                lambda pending: [name for name, is_pending in pending.items() if is_pending]
+            ),
+        )
+
+
+def _diff(old: str, new: str) -> str:
+    return ''.join(
+        difflib.unified_diff(
+            old.splitlines(keepends=True),
+            new.splitlines(keepends=True),
+            fromfile='deployed',
+            tofile='rendered',
+        )
+    )
@@ -0,0 +1,219 @@
+"""Configuration of CoreDNS and installation of a node-local DNS cache."""
+
+import pulumi as p
+import pulumi_command as command
+import pulumi_kubernetes as k8s
+
+from kubernetes.components import ComponentContext
+from kubernetes.model import ClusterDnsConfig, NodeLocalDnsConfig
+from kubernetes.scraping import get_scrape_annotations
+from kubernetes.templates import load_template
+
+NAMESPACE = 'kube-system'
+NODE_LOCAL_DNS_METRICS_PORT = 9253
+
+
+def ensure_cluster_dns(context: ComponentContext) -> p.Resource:
+    cluster_dns_config = context.component_config.cluster_dns
+    assert cluster_dns_config, 'cluster DNS not configured'
+    k8s_opts = p.ResourceOptions(provider=context.k8s_provider)
+
+    # enabled by default on recent microk8s versions, a no-op then:
+    enable_dns = command.remote.Command(
+        'cluster-dns-enable',
+        connection=context.master_connection,
+        add_previous_output_in_env=False,
+        create='microk8s enable dns',
+        logging=command.remote.Logging.STDERR,
+    )
+    coredns_opts = p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[enable_dns]))
+
+    coredns_config = cluster_dns_config.coredns
+    k8s.core.v1.ConfigMapPatch(
+        'coredns',
+        metadata={
+            # names as given by microk8s:
+            'name': 'coredns',
+            'namespace': NAMESPACE,
+            'annotations': {'pulumi.com/patchForce': 'true'},
+        },
+        data={
+            # picked up by the reload plugin without restarting the pods:
+            'Corefile': _render_corefile(
+                'coredns.Corefile',
+                cluster_dns_config,
+                cache_ttl_s=coredns_config.cache_ttl_s,
+                prefetch=coredns_config.prefetch,
+            ),
+        },
+        opts=coredns_opts,
+    )
+
+    coredns = k8s.apps.v1.DeploymentPatch(
+        'coredns',
+        metadata={
+            'name': 'coredns',
+            'namespace': NAMESPACE,
+            'annotations': {'pulumi.com/patchForce': 'true'},
+        },
+        spec={
+            'replicas': coredns_config.replicas,
+            'template': {
+                'spec': {
+                    # keep the replicas on different nodes where possible:
+                    'topology_spread_constraints': [
+                        {
+                            'max_skew': 1,
+                            'topology_key': 'kubernetes.io/hostname',
+                            'when_unsatisfiable': 'ScheduleAnyway',
+                            'label_selector': {'match_labels': {'k8s-app': 'kube-dns'}},
+                        }
+                    ],
+                },
+            },
+        },
+        opts=coredns_opts,
+    )
+
+    if cluster_dns_config.node_local_dns:
+        return _create_node_local_dns(
+            context,
+            cluster_dns_config,
+            cluster_dns_config.node_local_dns,
+            k8s_opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[coredns])),
+        )
+
+    return coredns
+
+
+def _create_node_local_dns(
+    context: ComponentContext,
+    cluster_dns_config: ClusterDnsConfig,
+    node_local_dns_config: NodeLocalDnsConfig,
+    *,
+    k8s_opts: p.ResourceOptions,
+) -> p.Resource:
+    labels = {'k8s-app': 'node-local-dns'}
+    local_ips = f'{node_local_dns_config.local_ipv4},{cluster_dns_config.service_ipv4}'
+
+    service_account = k8s.core.v1.ServiceAccount(
+        'node-local-dns',
+        metadata={'name': 'node-local-dns', 'namespace': NAMESPACE},
+        opts=k8s_opts,
+    )
+
+    # CoreDNS as reached by the cache, as the kube-dns service IP is taken over by the cache:
+    upstream = k8s.core.v1.Service(
+        'kube-dns-upstream',
+        metadata={'name': 'kube-dns-upstream', 'namespace': NAMESPACE},
+        spec={
+            'selector': {'k8s-app': 'kube-dns'},
+            'ports': [
+                {'name': 'dns', 'port': 53, 'protocol': 'UDP', 'target_port': 53},
+                {'name': 'dns-tcp', 'port': 53, 'protocol': 'TCP', 'target_port': 53},
+            ],
+        },
+        opts=k8s_opts,
+    )
+
+    config = k8s.core.v1.ConfigMap(
+        'node-local-dns',
+        metadata={'name': 'node-local-dns', 'namespace': NAMESPACE},
+        data={
+            'Corefile': _render_corefile(
+                'node-local-dns.Corefile',
+                cluster_dns_config,
+                cache_ttl_s=node_local_dns_config.cache_ttl_s,
+                local_ipv4=str(node_local_dns_config.local_ipv4),
+            ),
+        },
+        opts=k8s_opts,
+    )
+
+    return k8s.apps.v1.DaemonSet(
+        'node-local-dns',
+        metadata={'name': 'node-local-dns', 'namespace': NAMESPACE, 'labels': labels},
+        spec={
+            'selector': {'match_labels': labels},
+            'update_strategy': {'rolling_update': {'max_unavailable': '10%'}},
+            'template': {
+                'metadata': {
+                    'labels': labels,
+                    'annotations': get_scrape_annotations(
+                        context.component_config, NODE_LOCAL_DNS_METRICS_PORT
+                    ),
+                },
+                'spec': {
+                    'priority_class_name': 'system-node-critical',
+                    'service_account_name': service_account.metadata.name,
+                    # listens on the node's link-local and kube-dns service IP and installs
+                    # NOTRACK rules, so that lookups avoid conntrack:
+                    'host_network': True,
+                    'dns_policy': 'Default',
+                    'tolerations': [{'operator': 'Exists'}],
+                    'containers': [
+                        {
+                            'name': 'node-cache',
+                            'image': node_local_dns_config.image,
+                            'args': [
+                                '-localip',
+                                local_ips,
+                                '-conf',
+                                '/etc/Corefile',
+                                '-upstreamsvc',
+                                upstream.metadata.name,
+                            ],
+                            'security_context': {'capabilities': {'add': ['NET_ADMIN']}},
+                            'resources': {'requests': {'cpu': '25m', 'memory': '5Mi'}},
+                            'ports': [
+                                {'name': 'dns', 'container_port': 53, 'protocol': 'UDP'},
+                                {'name': 'dns-tcp', 'container_port': 53, 'protocol': 'TCP'},
+                                {
+                                    'name': 'metrics',
+                                    'container_port': NODE_LOCAL_DNS_METRICS_PORT,
+                                    'protocol': 'TCP',
+                                },
+                            ],
+                            'liveness_probe': {
+                                'http_get': {
+                                    'host': str(node_local_dns_config.local_ipv4),
+                                    'path': '/health',
+                                    'port': 8080,
+                                },
+                                'initial_delay_seconds': 60,
+                                'timeout_seconds': 5,
+                            },
+                            'volume_mounts': [
+                                {'name': 'xtables-lock', 'mount_path': '/run/xtables.lock'},
+                                {'name': 'config-volume', 'mount_path': '/etc/coredns'},
+                            ],
+                        }
+                    ],
+                    'volumes': [
+                        {
+                            'name': 'xtables-lock',
+                            'host_path': {'path': '/run/xtables.lock', 'type': 'FileOrCreate'},
+                        },
+                        {
+                            'name': 'config-volume',
+                            'config_map': {
+                                'name': config.metadata.name,
+                                # node-cache derives /etc/Corefile from the base file:
+                                'items': [{'key': 'Corefile', 'path': 'Corefile.base'}],
+                            },
+                        },
+                    ],
+                },
+            },
+        },
+        opts=k8s_opts,
+    )
+
+
+def _render_corefile(name: str, cluster_dns_config: ClusterDnsConfig, **values) -> str:
+    return load_template('cluster-dns', name).render(
+        cluster_domain=cluster_dns_config.cluster_domain,
+        service_ipv4=str(cluster_dns_config.service_ipv4),
+        upstream_servers=[str(server) for server in cluster_dns_config.upstream_servers],
+        **values,
+    )
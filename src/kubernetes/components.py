@@ -0,0 +1,102 @@
+"""Registry of the optional components installed into the cluster."""
+
+import collections.abc
+import dataclasses
+import importlib
+
+import pulumi as p
+import pulumi_command as command
+import pulumi_kubernetes as k8s
+
+from kubernetes.dns import DnsRecords
+from kubernetes.model import ComponentConfig
+
+
+@dataclasses.dataclass(frozen=True)
+class ComponentContext:
+    component_config: ComponentConfig
+    k8s_provider: k8s.Provider
+    dns_records: DnsRecords
+    # SSH connection to the first master, e.g. for commands not covered by the k8s provider:
+    master_connection: command.remote.ConnectionArgs
+    # resources signalling readiness of the components this one depends on, by component name:
+    dependencies: dict[str, p.Resource]
+
+
+@dataclasses.dataclass(frozen=True)
+class Component:
+    # name of the component's config in `ComponentConfig`:
+    name: str
+    # module and function installing the component, the module is only imported if enabled:
+    module: str
+    function: str
+    depends_on: tuple[str, ...] = ()
+    # components waited for only if they are enabled:
+    optional_depends_on: tuple[str, ...] = ()
+
+
+# in order of installation, components depend on earlier components only:
+COMPONENTS = (
+    Component('cluster_dns', 'kubernetes.cluster_dns', 'ensure_cluster_dns'),
+    Component('metallb', 'kubernetes.metallb', 'ensure_metallb'),
+    Component('cert_manager', 'kubernetes.cert_manager', 'ensure_cert_manager'),
+    Component('metrics_server', 'kubernetes.metrics_server', 'ensure_metrics_server'),
+    Component(
+        'traefik',
+        'kubernetes.traefik',
+        'ensure_traefik',
+        depends_on=('metallb', 'cert_manager'),
+    ),
+    Component('csi_driver_smb', 'kubernetes.samba', 'ensure_csi_driver_smb'),
+    Component('local_pv', 'kubernetes.local_pv', 'ensure_local_pv', depends_on=('cert_manager',)),
+    Component('monitoring', 'kubernetes.monitoring', 'ensure_monitoring'),
+    Component('load_test', 'kubernetes.load_test', 'ensure_load_test', depends_on=('traefik',)),
+    Component('registry_cache', 'kubernetes.registry_cache', 'ensure_registry_cache'),
+    Component(
+        'storage_benchmark',
+        'kubernetes.storage_benchmark',
+        'ensure_storage_benchmark',
+        optional_depends_on=('csi_driver_smb', 'local_pv'),
+    ),
+)
+
+
+def get_enabled_components(component_config: ComponentConfig) -> list[Component]:
+    enabled = [component for component in COMPONENTS if component_config.is_enabled(component.name)]
+
+    enabled_names = {component.name for component in enabled}
+    for component in enabled:
+        if missing := [name for name in component.depends_on if name not in enabled_names]:
+            raise ValueError(f'component {component.name} requires {", ".join(missing)}')
+
+    return enabled
+
+
+def ensure_components(
+    component_config: ComponentConfig,
+    *,
+    k8s_provider: k8s.Provider,
+    dns_records: DnsRecords,
+    master_connection: command.remote.ConnectionArgs,
+) -> dict[str, p.Resource]:
+    # components only wait for their declared dependencies, all others deploy in parallel:
+    resources: dict[str, p.Resource] = {}
+    for component in get_enabled_components(component_config):
+        ensure: collections.abc.Callable[[ComponentContext], p.Resource] = getattr(
+            importlib.import_module(component.module), component.function
+        )
+        resources[component.name] = ensure(
+            ComponentContext(
+                component_config=component_config,
+                k8s_provider=k8s_provider,
+                dns_records=dns_records,
+                master_connection=master_connection,
+                dependencies={
+                    name: resources[name]
+                    for name in component.depends_on + component.optional_depends_on
+                    if name in resources
+                },
+            )
+        )
+
+    return resources
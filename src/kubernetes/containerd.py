@@ -0,0 +1,24 @@
+"""containerd settings of the nodes, which depend on the enabled components."""
+
+from kubernetes.model import ComponentConfig
+
+
+def get_containerd_registry_configs(component_config: ComponentConfig) -> dict[str, str]:
+    """Return containerd's `hosts.toml` content for each cached registry."""
+    registry_cache_config = component_config.registry_cache
+    if not registry_cache_config or not registry_cache_config.enabled:
+        return {}
+
+    # containerd falls back to the upstream server if the cache is not (yet) available:
+    return {
+        mirror_config.registry: '\n'.join(
+            (
+                f'server = "{str(mirror_config.upstream_url).rstrip("/")}"',
+                '',
+                f'[host."http://localhost:{mirror_config.node_port}"]',
+                '  capabilities = ["pull", "resolve"]',
+                '',
+            )
+        )
+        for mirror_config in registry_cache_config.mirrors
+    }
@@ -0,0 +1,172 @@
+"""DNS records of the stack, reconciled with the UniFi controller in bulk."""
+
+import os
+import typing
+
+import httpx
+import pulumi as p
+
+from kubernetes.model import ComponentConfig
+
+STATIC_DNS_PATH = '/proxy/network/v2/api/site/default/static-dns'
+
+
+class DnsRecords:
+    """Desired DNS records of the stack, synced by a single resource."""
+
+    def __init__(self):
+        self.records: dict[str, p.Input[str]] = {}
+
+    def add(self, domain_name: str, ipv4: p.Input[str]):
+        assert domain_name not in self.records, f'duplicate DNS record {domain_name}'
+        self.records[domain_name] = ipv4
+
+    def sync(self, component_config: ComponentConfig) -> 'UnifyDnsRecordSet':
+        return UnifyDnsRecordSet(
+            'dns-records',
+            base_url=str(component_config.unify.url),
+            api_token=p.Output.secret(os.environ['UNIFY_API_TOKEN__PULUMI']),
+            verify_ssl=component_config.unify.verify_ssl,
+            records=self.records,
+        )
+
+
+class UnifyDnsRecordSetProvider(p.dynamic.ResourceProvider):
+    """Sync A records with one listing of the zone and only the necessary changes.
+
+    Records are matched by domain name. Records which were managed before and are no longer
+    desired get deleted, all other records of the zone are left alone. Records changed or deleted
+    outside of the stack show up as a diff after a refresh, e.g. with `pulumi up --refresh`.
+    """
+
+    @typing.override
+    def create(self, props: dict[str, typing.Any]) -> p.dynamic.CreateResult:
+        record_ids = self._sync(props, managed={})
+        return p.dynamic.CreateResult(
+            id_=props['base_url'],
+            outs=props | {'record_ids': record_ids},
+        )
+
+    @typing.override
+    def read(self, id_: str, props: dict[str, typing.Any]) -> p.dynamic.ReadResult:
+        with _create_client(props) as client:
+            existing = _list_records(client)
+
+        # the managed records as they are live, missing or disabled ones are recreated on update:
+        records: dict[str, str] = {}
+        record_ids: dict[str, str] = {}
+        for domain_name in props.get('record_ids') or {}:
+            if entry := existing.get(domain_name):
+                record_ids[domain_name] = entry['_id']
+                if entry['enabled']:
+                    records[domain_name] = entry['value']
+
+        return p.dynamic.ReadResult(
+            id_=id_,
+            outs=props | {'records': records, 'record_ids': record_ids},
+        )
+
+    @typing.override
+    def diff(
+        self, _id: str, _olds: dict[str, typing.Any], _news: dict[str, typing.Any]
+    ) -> p.dynamic.DiffResult:
+        keys = ('base_url', 'verify_ssl', 'records')
+        return p.dynamic.DiffResult(
+            changes=any(_olds.get(key) != _news.get(key) for key in keys),
+            replaces=['base_url'] if _olds.get('base_url') != _news.get('base_url') else [],
+            delete_before_replace=True,
+        )
+
+    @typing.override
+    def update(
+        self, _id: str, _olds: dict[str, typing.Any], _news: dict[str, typing.Any]
+    ) -> p.dynamic.UpdateResult:
+        record_ids = self._sync(_news, managed=_olds.get('record_ids', {}))
+        return p.dynamic.UpdateResult(outs=_news | {'record_ids': record_ids})
+
+    @typing.override
+    def delete(self, _id: str, _props: dict[str, typing.Any]):
+        self._sync(_props | {'records': {}}, managed=_props.get('record_ids', {}))
+
+    def _sync(self, props: dict[str, typing.Any], *, managed: dict[str, str]) -> dict[str, str]:
+        desired: dict[str, str] = props['records']
+
+        # a single client keeps the connection alive for all requests of the sync:
+        with _create_client(props) as client:
+            existing = _list_records(client)
+
+            record_ids: dict[str, str] = {}
+            for domain_name, ipv4 in sorted(desired.items()):
+                entry = existing.get(domain_name)
+                if entry is None:
+                    response = client.post(
+                        STATIC_DNS_PATH,
+                        json={
+                            'key': domain_name,
+                            'value': ipv4,
+                            'record_type': 'A',
+                            'enabled': True,
+                        },
+                    )
+                    response.raise_for_status()
+                    entry = response.json()
+                elif entry['value'] != ipv4 or not entry['enabled']:
+                    response = client.put(
+                        f'{STATIC_DNS_PATH}/{entry["_id"]}',
+                        json=entry | {'value': ipv4, 'enabled': True},
+                    )
+                    response.raise_for_status()
+
+                record_ids[domain_name] = entry['_id']
+
+            existing_ids = {entry['_id'] for entry in existing.values()}
+            for domain_name, record_id in sorted(managed.items()):
+                if domain_name not in desired and record_id in existing_ids:
+                    client.delete(f'{STATIC_DNS_PATH}/{record_id}').raise_for_status()
+
+        return record_ids
+
+
+def _create_client(props: dict[str, typing.Any]) -> httpx.Client:
+    return httpx.Client(
+        base_url=props['base_url'],
+        headers={'X-API-KEY': props['api_token']},
+        verify=props['verify_ssl'],
+        timeout=30,
+    )
+
+
+def _list_records(client: httpx.Client) -> dict[str, dict[str, typing.Any]]:
+    """Return the A records of the zone by domain name."""
+    response = client.get(STATIC_DNS_PATH)
+    response.raise_for_status()
+    return {entry['key']: entry for entry in response.json() if entry['record_type'] == 'A'}
+
+
+class UnifyDnsRecordSet(p.dynamic.Resource):
+    record_ids: p.Output[dict[str, str]]
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        base_url: p.Input[str],
+        api_token: p.Input[str],
+        verify_ssl: p.Input[bool],
+        records: p.Input[dict[str, p.Input[str]]],
+        opts: p.ResourceOptions | None = None,
+    ):
+        super().__init__(
+            UnifyDnsRecordSetProvider(),
+            name,
+            {
+                'base_url': base_url,
+                'api_token': api_token,
+                'verify_ssl': verify_ssl,
+                'records': records,
+                'record_ids': None,
+            },
+            opts=p.ResourceOptions.merge(
+                p.ResourceOptions(additional_secret_outputs=['api_token']), opts
+            ),
+        )
@@ -0,0 +1,212 @@
+"""Load test of the ingress path, run in the cluster after every change of traefik or run."""
+
+import json
+import pathlib
+import shlex
+import typing
+
+import pulumi as p
+import pulumi_command as command
+import pulumi_kubernetes as k8s
+
+from kubernetes.components import ComponentContext
+from kubernetes.model import LoadTestConfig
+
+PERCENTILES = (50, 95, 99)
+
+CHECK_RESULTS_PATH = pathlib.Path('assets/load-test/check-results.py')
+
+
+def ensure_load_test(context: ComponentContext) -> p.Resource:
+    component_config = context.component_config
+    load_test_config = component_config.load_test
+    assert load_test_config, 'load test not configured'
+    traefik = context.dependencies['traefik']
+    assert isinstance(traefik, k8s.helm.v3.Release)
+    k8s_opts = p.ResourceOptions(provider=context.k8s_provider)
+
+    host = f'{load_test_config.host_prefix}.{component_config.microk8s.sub_domain}'
+    labels = {'app': 'echo'}
+
+    ns = k8s.core.v1.Namespace(
+        'load-test',
+        metadata={
+            'name': 'load-test',
+        },
+        opts=k8s_opts,
+    )
+
+    echo = k8s.apps.v1.Deployment(
+        'echo',
+        metadata={'name': 'echo', 'namespace': ns.metadata.name},
+        spec={
+            'replicas': load_test_config.echo_replicas,
+            'selector': {'match_labels': labels},
+            'template': {
+                'metadata': {'labels': labels},
+                'spec': {
+                    'containers': [
+                        {
+                            'name': 'echo',
+                            'image': load_test_config.echo_image,
+                            'ports': [{'name': 'http', 'container_port': 80}],
+                            'readiness_probe': {'http_get': {'path': '/health', 'port': 'http'}},
+                        }
+                    ],
+                },
+            },
+        },
+        opts=k8s_opts,
+    )
+
+    service = k8s.core.v1.Service(
+        'echo',
+        metadata={'name': 'echo', 'namespace': ns.metadata.name},
+        spec={
+            'selector': labels,
+            'ports': [{'name': 'http', 'port': 80, 'target_port': 'http'}],
+        },
+        opts=k8s_opts,
+    )
+
+    ingress = k8s.networking.v1.Ingress(
+        'echo',
+        metadata={
+            'name': 'echo',
+            'namespace': ns.metadata.name,
+            # traefik does not publish a load balancer status to wait for:
+            'annotations': {'pulumi.com/skipAwait': 'true'},
+        },
+        spec={
+            'rules': [
+                {
+                    'host': host,
+                    'http': {
+                        'paths': [
+                            {
+                                'path': '/',
+                                'path_type': 'Prefix',
+                                'backend': {
+                                    'service': {
+                                        'name': service.metadata.name,
+                                        'port': {'name': 'http'},
+                                    }
+                                },
+                            }
+                        ]
+                    },
+                }
+            ],
+            # served with traefik's default certificate:
+            'tls': [{'hosts': [host]}],
+        },
+        opts=k8s_opts,
+    )
+
+    # send traffic to the load balancer IP instead of resolving the host via DNS, so that the test
+    # does not depend on anything outside the cluster:
+    traefik_service = k8s.core.v1.Service.get(
+        'load-test-traefik',
+        p.Output.concat(traefik.status.namespace, '/', traefik.status.name),
+        opts=k8s_opts,
+    )
+    ipv4 = traefik_service.status.load_balancer.ingress[0].ip
+    url = f'https://{host}/'
+
+    job = k8s.batch.v1.Job(
+        'ingress-load-test',
+        metadata={'namespace': ns.metadata.name},
+        spec={
+            'backoff_limit': 0,
+            'template': {
+                'metadata': {
+                    # replace the job and hence run the test again with every upgrade and run:
+                    'annotations': {
+                        'traefik-revision': traefik.status.revision.apply(str),
+                        'load-test-run': str(load_test_config.run),
+                    },
+                },
+                'spec': {
+                    'restart_policy': 'Never',
+                    'init_containers': [
+                        {
+                            # wait for traefik to pick up the ingress:
+                            'name': 'wait-for-route',
+                            'image': load_test_config.curl_image,
+                            'args': [
+                                '--silent',
+                                '--fail',
+                                '--insecure',
+                                '--retry=30',
+                                '--retry-delay=2',
+                                '--retry-all-errors',
+                                p.Output.format('--resolve={}:443:{}', host, ipv4),
+                                '--output=/dev/null',
+                                url,
+                            ],
+                        }
+                    ],
+                    'containers': [
+                        {
+                            'name': 'fortio',
+                            'image': load_test_config.load_generator_image,
+                            'args': _get_fortio_args(load_test_config, url=url, ipv4=ipv4),
+                        }
+                    ],
+                },
+            },
+        },
+        opts=p.ResourceOptions.merge(
+            k8s_opts, p.ResourceOptions(depends_on=[echo, ingress, traefik])
+        ),
+    )
+
+    # the thresholds are checked on the master, so that a violation fails the create of the
+    # command, which therefore never gets into the state and runs again with the next update:
+    results = command.remote.Command(
+        'ingress-load-test-results',
+        connection=context.master_connection,
+        add_previous_output_in_env=False,
+        create=p.Output.format(
+            'microk8s kubectl logs --namespace {} job/{} --container fortio | python3 -c {} {}',
+            ns.metadata.name,
+            job.metadata.name,
+            shlex.quote(CHECK_RESULTS_PATH.read_text()),
+            shlex.quote(json.dumps(load_test_config.thresholds.model_dump())),
+        ),
+        logging=command.remote.Logging.STDERR,
+        triggers=[job.metadata.uid, load_test_config.run],
+        opts=p.ResourceOptions(depends_on=[job]),
+    )
+
+    p.export('ingress-load-test', results.stdout.apply(parse_load_test_summary))
+
+    return job
+
+
+def _get_fortio_args(
+    load_test_config: LoadTestConfig, *, url: str, ipv4: p.Output[str]
+) -> list[p.Input[str]]:
+    return [
+        'load',
+        '-qps',
+        str(load_test_config.requests_per_second),
+        '-c',
+        str(load_test_config.connections),
+        '-t',
+        f'{load_test_config.duration_s}s',
+        '-p',
+        ','.join(str(percentile) for percentile in PERCENTILES),
+        '-resolve',
+        ipv4,
+        '-k',
+        # results as JSON on stdout, after the log output:
+        '-json',
+        '-',
+        url,
+    ]
+
+
+def parse_load_test_summary(output: str) -> dict[str, typing.Any] | None:
+    # nothing to export before the load test ran:
+    return json.loads(output) if output else None
@@ -0,0 +1,133 @@
+"""Installation of TopoLVM, provisioning local PVs from the LVM thin pool of each node."""
+
+import pulumi as p
+import pulumi_kubernetes as k8s
+
+from kubernetes.charts import get_chart
+from kubernetes.components import ComponentContext
+
+# names as created by cloud-init on the local PV disk:
+VOLUME_GROUP = 'local-pv'
+THIN_POOL = 'thin'
+DEVICE_CLASS = 'thin'
+
+DRIVER_NAME = 'topolvm.io'
+
+
+def ensure_local_pv(context: ComponentContext) -> p.Resource:
+    component_config = context.component_config
+    local_pv_config = component_config.local_pv
+    assert local_pv_config, 'local PVs not configured'
+    k8s_provider = context.k8s_provider
+    k8s_opts = p.ResourceOptions(provider=k8s_provider)
+
+    # the TopoLVM webhook must not intercept pods of the system namespaces:
+    webhook_ignore_labels = {'topolvm.io/webhook': 'ignore'}
+    ns = k8s.core.v1.Namespace(
+        'topolvm-system',
+        metadata={
+            'name': 'topolvm-system',
+            'labels': webhook_ignore_labels,
+        },
+        opts=k8s_opts,
+    )
+    kube_system = k8s.core.v1.NamespacePatch(
+        'kube-system-topolvm-webhook-ignore',
+        metadata={
+            'name': 'kube-system',
+            'labels': webhook_ignore_labels,
+            'annotations': {'pulumi.com/patchForce': 'true'},
+        },
+        opts=k8s_opts,
+    )
+
+    topolvm = k8s.helm.v3.Release(
+        'topolvm',
+        chart=get_chart(
+            'topolvm',
+            repo='https://topolvm.github.io/topolvm',
+            chart_config=local_pv_config,
+        ),
+        namespace=ns.metadata.name,
+        values={
+            'lvmd': {
+                'deviceClasses': [
+                    {
+                        'name': DEVICE_CLASS,
+                        'volume-group': VOLUME_GROUP,
+                        'default': True,
+                        'spare-gb': 0,
+                        'type': 'thin',
+                        'thin-pool': {
+                            'name': THIN_POOL,
+                            'overprovision-ratio': local_pv_config.overprovision_ratio,
+                        },
+                    }
+                ],
+            },
+            'node': {
+                # as used by microk8s' kubelet:
+                'kubeletWorkDirectory': '/var/snap/microk8s/common/var/lib/kubelet',
+            },
+            'controller': {
+                # report free space of each node's thin pool to the scheduler via
+                # CSIStorageCapacity objects:
+                'storageCapacityTracking': {'enabled': True},
+            },
+            'snapshot': {'enabled': local_pv_config.snapshot_controller is not None},
+            'storageClasses': [
+                {
+                    'name': name,
+                    'storageClass': {
+                        'fsType': local_pv_config.fs_type,
+                        'isDefaultClass': False,
+                        'reclaimPolicy': reclaim_policy,
+                        # bind only once the pod is scheduled, to a node with enough capacity:
+                        'volumeBindingMode': 'WaitForFirstConsumer',
+                        'allowVolumeExpansion': True,
+                        'additionalParameters': {f'{DRIVER_NAME}/device-class': DEVICE_CLASS},
+                    },
+                }
+                for name, reclaim_policy in (
+                    ('local-lvm', 'Delete'),
+                    ('local-lvm-retained', 'Retain'),
+                )
+            ],
+        },
+        opts=p.ResourceOptions.merge(
+            k8s_opts,
+            p.ResourceOptions(depends_on=[context.dependencies['cert_manager'], kube_system]),
+        ),
+    )
+
+    if snapshot_controller_config := local_pv_config.snapshot_controller:
+        # the snapshot controller ships the VolumeSnapshot CRDs, which microk8s lacks:
+        snapshot_controller = k8s.helm.v3.Release(
+            'snapshot-controller',
+            chart=get_chart(
+                'snapshot-controller',
+                repo='https://piraeus.io/helm-charts',
+                chart_config=snapshot_controller_config,
+            ),
+            namespace='kube-system',
+            opts=k8s_opts,
+        )
+
+        # a CustomResource only supports a spec, which snapshot classes do not have:
+        k8s.yaml.v2.ConfigGroup(
+            'local-lvm-snapshots',
+            objs=[
+                {
+                    'apiVersion': 'snapshot.storage.k8s.io/v1',
+                    'kind': 'VolumeSnapshotClass',
+                    'metadata': {'name': 'local-lvm'},
+                    'driver': DRIVER_NAME,
+                    'deletionPolicy': 'Delete',
+                }
+            ],
+            opts=p.ResourceOptions.merge(
+                k8s_opts, p.ResourceOptions(depends_on=[snapshot_controller, topolvm])
+            ),
+        )
+
+    return topolvm
@@ -1,12 +1,23 @@
 """Installation of metallb load balancer."""
 
+import typing
+
 import pulumi as p
 import pulumi_kubernetes as k8s
 
-from kubernetes.model import ComponentConfig
+from kubernetes.charts import get_chart
+from kubernetes.components import ComponentContext
+from kubernetes.model import MetalLbBgpPeerConfig, MetalLbPoolConfig
+from kubernetes.scraping import get_scrape_annotations
+
+METRICS_PORT = 7472
+
 
+def ensure_metallb(context: ComponentContext) -> p.Resource:
+    metallb_config = context.component_config.metallb
+    assert metallb_config, 'metallb not configured'
+    k8s_provider = context.k8s_provider
 
-def ensure_metallb(component_config: ComponentConfig, k8s_provider: k8s.Provider) -> p.Resource:
     ns = k8s.core.v1.Namespace(
         'metallb-system',
         metadata={
@@ -15,48 +26,139 @@ def ensure_metallb(component_config: ComponentConfig, k8s_provider: k8s.Provider
         opts=p.ResourceOptions(provider=k8s_provider),
     )
 
-    namespaced_k8s_provider = k8s.Provider(
-        'metallb-provider',
-        kubeconfig=k8s_provider.kubeconfig,  # pyright: ignore[reportAttributeAccessIssue]
-        namespace=ns.metadata.name,
-    )
-    k8s_opts = p.ResourceOptions(provider=namespaced_k8s_provider)
+    k8s_opts = p.ResourceOptions(provider=k8s_provider)
 
     # use Release instead of Chart in order to have one resource instead many individual:
     metallb = k8s.helm.v3.Release(
         'metallb',
-        chart='metallb',
-        version=component_config.metallb.version,
-        repository_opts={'repo': 'https://metallb.github.io/metallb'},
+        chart=get_chart(
+            'metallb',
+            repo='https://metallb.github.io/metallb',
+            chart_config=metallb_config,
+        ),
+        namespace=ns.metadata.name,
+        values={
+            'controller': {
+                'podAnnotations': get_scrape_annotations(context.component_config, METRICS_PORT)
+            },
+            'speaker': {
+                'podAnnotations': get_scrape_annotations(context.component_config, METRICS_PORT)
+            },
+        },
         opts=k8s_opts,
     )
 
+    metallb_opts = p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[metallb]))
+
+    for peer_config in metallb_config.bgp_peers:
+        _create_bgp_peer(peer_config, namespace=ns.metadata.name, metallb_opts=metallb_opts)
+
+    advertisements = [
+        _create_pool(
+            pool_config,
+            namespace=ns.metadata.name,
+            metallb_opts=metallb_opts,
+        )
+        for pool_config in metallb_config.get_pools()
+    ]
+
+    # ingress takes its IP from the first pool:
+    return advertisements[0]
+
+
+def _create_bgp_peer(
+    peer_config: MetalLbBgpPeerConfig,
+    *,
+    namespace: p.Input[str],
+    metallb_opts: p.ResourceOptions,
+):
+    spec: dict[str, typing.Any] = {
+        'myASN': peer_config.my_asn,
+        'peerASN': peer_config.peer_asn,
+        'peerAddress': str(peer_config.peer_address),
+    }
+    if peer_config.node_selector:
+        spec['nodeSelectors'] = [{'matchLabels': peer_config.node_selector}]
+
+    if peer_config.password:
+        password = k8s.core.v1.Secret(
+            f'bgp-peer-{peer_config.name}-password',
+            metadata={'namespace': namespace},
+            type='kubernetes.io/basic-auth',
+            string_data={'password': peer_config.password.value},
+            opts=metallb_opts,
+        )
+        spec['passwordSecret'] = {'name': password.metadata.name, 'namespace': namespace}
+
     k8s.apiextensions.CustomResource(
-        'default',
+        f'bgp-peer-{peer_config.name}',
+        api_version='metallb.io/v1beta2',
+        kind='BGPPeer',
+        metadata={
+            'name': peer_config.name,
+            'namespace': namespace,
+        },
+        spec=spec,
+        opts=metallb_opts,
+    )
+
+
+def _create_pool(
+    pool_config: MetalLbPoolConfig,
+    *,
+    namespace: p.Input[str],
+    metallb_opts: p.ResourceOptions,
+) -> p.Resource:
+    # keep the resource names of the former single default pool:
+    is_default = pool_config.name == 'default'
+
+    pool = k8s.apiextensions.CustomResource(
+        'default' if is_default else f'pool-{pool_config.name}',
         api_version='metallb.io/v1beta1',
         kind='IPAddressPool',
         metadata={
-            'name': 'default',
+            'name': pool_config.name,
+            'namespace': namespace,
         },
         spec={
-            'addresses': [
-                '-'.join(
-                    (
-                        str(component_config.metallb.ipv4_start),
-                        str(component_config.metallb.ipv4_end),
-                    )
-                )
-            ],
+            'addresses': [f'{pool_config.ipv4_start}-{pool_config.ipv4_end}'],
+            'autoAssign': pool_config.auto_assign,
         },
-        opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[metallb])),
+        opts=metallb_opts,
     )
 
+    advertisement_opts = p.ResourceOptions.merge(metallb_opts, p.ResourceOptions(depends_on=[pool]))
+
+    if pool_config.mode == 'bgp':
+        name = f'{pool_config.name}-bgp-advertisement'
+        return k8s.apiextensions.CustomResource(
+            name,
+            api_version='metallb.io/v1beta1',
+            kind='BGPAdvertisement',
+            metadata={
+                'name': name,
+                'namespace': namespace,
+            },
+            spec={
+                'ipAddressPools': [pool_config.name],
+                # announce each service IP on its own, so that the router can balance per IP:
+                'aggregationLength': 32,
+                **({'peers': pool_config.peers} if pool_config.peers else {}),
+            },
+            opts=advertisement_opts,
+        )
+
+    name = 'default-l2-advertisment' if is_default else f'{pool_config.name}-l2-advertisement'
     return k8s.apiextensions.CustomResource(
-        'default-l2-advertisment',
+        name,
         api_version='metallb.io/v1beta1',
         kind='L2Advertisement',
         metadata={
-            'name': 'default-l2-advertisment',
+            'name': name,
+            'namespace': namespace,
+        },
+        spec={
+            'ipAddressPools': [pool_config.name],
         },
-        opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[metallb])),
+        opts=advertisement_opts,
     )
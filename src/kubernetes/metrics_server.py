@@ -0,0 +1,30 @@
+"""Installation of metrics-server, providing the resource metrics used by autoscaling."""
+
+import pulumi as p
+import pulumi_kubernetes as k8s
+
+from kubernetes.charts import get_chart
+from kubernetes.components import ComponentContext
+
+
+def ensure_metrics_server(context: ComponentContext) -> p.Resource:
+    metrics_server_config = context.component_config.metrics_server
+    assert metrics_server_config, 'metrics-server not configured'
+
+    return k8s.helm.v3.Release(
+        'metrics-server',
+        chart=get_chart(
+            'metrics-server',
+            repo='https://kubernetes-sigs.github.io/metrics-server',
+            chart_config=metrics_server_config,
+        ),
+        namespace='kube-system',
+        values={
+            'args': [
+                # kubelet serving certificates of microk8s are self-signed:
+                '--kubelet-insecure-tls',
+                '--kubelet-preferred-address-types=InternalIP',
+            ],
+        },
+        opts=p.ResourceOptions(provider=context.k8s_provider),
+    )
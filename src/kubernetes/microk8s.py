@@ -1,7 +1,7 @@
 """Confoguration of Microk8s on Proxmox VE."""
 
-import os
-import pathlib
+import ipaddress
+import typing
 
 import jinja2
 import pulumi as p
@@ -9,182 +9,168 @@ import pulumi_command as command
 import pulumi_kubernetes as k8s
 import pulumi_proxmoxve as proxmoxve
 
-from mp.deploy_utils import unify
-
-from kubernetes.cert_manager import ensure_cert_manager
-from kubernetes.metallb import ensure_metallb
-from kubernetes.model import ComponentConfig
-from kubernetes.samba import ensure_csi_driver_smb
-from kubernetes.traefik import ensure_traefik
+from kubernetes.boot_profile import collect_boot_profile
+from kubernetes.cloud_config import CloudConfigRollout, create_snippet
+from kubernetes.components import ensure_components
+from kubernetes.containerd import get_containerd_registry_configs
+from kubernetes.dns import DnsRecords
+from kubernetes.model import ComponentConfig, PerformanceProfileConfig, VirtualMachineConfig
+from kubernetes.node_template import create_node_template
+from kubernetes.placement import PlacementPlan, get_placement_plan
+from kubernetes.providers import create_k8s_provider
+from kubernetes.templates import load_template
 
 
 def create_microk8s(component_config: ComponentConfig, proxmox_provider: proxmoxve.Provider):
     proxmox_opts = p.ResourceOptions(provider=proxmox_provider)
 
-    cloud_image = proxmoxve.download.File(
-        'cloud-image',
-        content_type='iso',
-        datastore_id='local',
-        node_name=component_config.proxmox.node_name,
-        overwrite=False,
-        overwrite_unmanaged=True,
-        url=str(component_config.microk8s.cloud_image_url),
-        opts=p.ResourceOptions.merge(
-            proxmox_opts,
-            p.ResourceOptions(retain_on_delete=True),
-        ),
-    )
-
-    cloud_config_template = jinja2.Template(
-        pathlib.Path('assets/cloud-init/cloud-config.yaml').read_text(),
-        undefined=jinja2.StrictUndefined,
-    )
-
-    stack_name = p.get_stack()
+    placement_plan = get_placement_plan(component_config, proxmox_provider)
 
-    first_master_ipv4 = None
-    for master_config in component_config.microk8s.master_nodes:
-        cloud_config = proxmoxve.storage.File(
-            f'cloud-config-master-{master_config.name}',
-            node_name=component_config.proxmox.node_name,
+    # images and templates are stored locally on each Proxmox node hosting VMs:
+    cloud_images: dict[str, proxmoxve.download.File] = {}
+    node_templates: dict[str, p.Resource] = {}
+    for node_name in placement_plan.node_names:
+        cloud_images[node_name] = proxmoxve.download.File(
+            'cloud-image'
+            if node_name == component_config.proxmox.node_name
+            else f'cloud-image-{node_name}',
+            content_type='iso',
             datastore_id='local',
-            content_type='snippets',
-            source_raw={
-                'data': cloud_config_template.render(
-                    master_config.model_dump()
-                    | {
-                        'username': component_config.microk8s.ssh_user,
-                        'ssh_public_key': component_config.microk8s.ssh_public_key,
-                        'data_disk_mount': component_config.microk8s.data_disk_mount,
-                    }
-                ),
-                'file_name': f'cloud-config-{master_config.name}.yaml',
-            },
+            node_name=node_name,
+            overwrite=False,
+            overwrite_unmanaged=True,
+            url=str(component_config.microk8s.cloud_image_url),
             opts=p.ResourceOptions.merge(
                 proxmox_opts,
-                p.ResourceOptions(delete_before_replace=True),
+                p.ResourceOptions(retain_on_delete=True),
             ),
         )
 
-        gateway_address = str(master_config.ipv4_address.network.network_address + 1)
+        if component_config.microk8s.node_template:
+            node_templates[node_name] = create_node_template(
+                component_config,
+                node_name=node_name,
+                offset=placement_plan.template_offset(node_name),
+                cloud_image=cloud_images[node_name],
+                proxmox_provider=proxmox_provider,
+            )
 
-        vlan_config: proxmoxve.vm.VirtualMachineNetworkDeviceArgsDict = (
-            {'vlan_id': int(component_config.microk8s.vlan_id)}
-            if component_config.microk8s.vlan_id
-            else {}
-        )
+    cloud_config_template = load_template('cloud-init', 'cloud-config.yaml')
+    cloud_config_rollout = CloudConfigRollout(component_config.microk8s.cloud_config_batch_size)
+    dns_records = DnsRecords()
 
-        master_vm = proxmoxve.vm.VirtualMachine(
-            master_config.name,
-            name=master_config.name,
-            node_name=component_config.proxmox.node_name,
-            vm_id=master_config.vmid,
-            tags=[stack_name],
-            description='Kubernetes Master, maintained with Pulumi.',
-            cpu={
-                'cores': master_config.cores,
-                # use exact CPU flags of host, as migration of VM for k8s nodes is irrelevant:
-                'type': 'host',
-            },
-            memory={
-                'dedicated': master_config.memory_mb_max,
-                'floating': master_config.memory_mb_min,
-            },
-            cdrom={'enabled': False},
-            disks=[
-                {
-                    'interface': 'virtio0',
-                    'size': master_config.root_disk_size_gb,
-                    'file_id': cloud_image.id,
-                    'iothread': True,
-                    'discard': 'on',
-                    'file_format': 'raw',
-                    # hack to avoid diff in subsequent runs:
-                    'speed': {
-                        'read': 10000,
-                    },
-                },
-                {
-                    'interface': 'virtio1',
-                    'size': master_config.data_disk_size_gb,
-                    'iothread': True,
-                    'discard': 'on',
-                    'file_format': 'raw',
-                    # hack to avoid diff in subsequent runs:
-                    'speed': {
-                        'read': 10000,
-                    },
-                },
-            ],
-            network_devices=[
-                {
-                    'bridge': 'vmbr0',
-                    'model': 'virtio',
-                    **vlan_config,
+    high_availability = component_config.microk8s.high_availability
+    rolling_update = component_config.microk8s.rolling_update
+    master_names = [master_config.name for master_config in component_config.microk8s.master_nodes]
+
+    first_master_vm: proxmoxve.vm.VirtualMachine | None = None
+    first_master_ipv4: p.Output[str] | None = None
+    master_connection: command.remote.ConnectionArgs | None = None
+    previous_master_join: p.Resource | None = None
+    previous_batch: list[p.Resource] = []
+    boot_profiles: dict[str, p.Output[dict[str, typing.Any]]] = {}
+    for batch in _rollout_batches(component_config):
+        current_batch: list[p.Resource] = []
+        for node_config in batch:
+            master = node_config.name in master_names
+            # the first master forms the cluster all other nodes join:
+            first_master = master and not master_connection
+            cloud_config_values: dict[str, typing.Any] = {'api_vip': None}
+            if master and high_availability:
+                cloud_config_values = {
+                    'api_vip': ipaddress.IPv4Interface(
+                        (high_availability.api_vip, node_config.ipv4_address.network.prefixlen)
+                    ),
+                    'vrrp_router_id': high_availability.vrrp_router_id,
+                    # prefer the first master to hold the VIP:
+                    'vrrp_priority': 150 - master_names.index(node_config.name),
                 }
-            ],
-            agent={'enabled': True},
-            initialization={
-                # TODO Turn into state IP address and setup DNS when config is refactored.
-                'ip_configs': [
-                    {
-                        'ipv4': {
-                            'address': str(master_config.ipv4_address),
-                            'gateway': gateway_address,
-                        }
-                    }
-                ],
-                'dns': {
-                    'domain': 'local',
-                    'servers': [gateway_address],
-                },
-                'user_data_file_id': cloud_config.id,
-            },
-            stop_on_destroy=True,
-            on_boot=stack_name == 'prod',
-            machine='q35',
-            # Linux 2.6+:
-            operating_system={'type': 'l26'},
-            opts=p.ResourceOptions.merge(
-                proxmox_opts,
-                p.ResourceOptions(ignore_changes=['cdrom']),
-            ),
-        )
 
-        master_vm_ipv4 = master_vm.ipv4_addresses[1][0]
-        p.export(f'{master_config.name}-ipv4', master_vm_ipv4)
+            node_vm, node_ipv4 = _create_node(
+                component_config,
+                node_config,
+                role='master' if master else 'worker',
+                first_master=first_master,
+                placement_plan=placement_plan,
+                cloud_images=cloud_images,
+                node_templates=node_templates,
+                cloud_config_template=cloud_config_template,
+                cloud_config_rollout=cloud_config_rollout,
+                cloud_config_values=cloud_config_values,
+                dns_records=dns_records,
+                # replace nodes of a batch only once the previous batch is serving again:
+                depends_on=previous_batch,
+                proxmox_opts=proxmox_opts,
+            )
 
-        # create DNS entries for master nodes:
-        dns_provider = unify.UnifyDnsRecordProvider(
-            base_url=str(component_config.unify.url),
-            api_token=os.environ['UNIFY_API_TOKEN__PULUMI'],
-            verify_ssl=component_config.unify.verify_ssl,
-        )
+            if component_config.microk8s.collect_boot_profiles:
+                boot_profiles[node_config.name] = collect_boot_profile(
+                    component_config,
+                    node_config.name,
+                    node_vm=node_vm,
+                    node_ipv4=node_ipv4,
+                )
 
-        unify.UnifyDnsRecord(
-            f'{master_config.name}-dns',
-            domain_name=f'{master_config.name}.{component_config.unify.internal_domain}',
-            ipv4=master_vm_ipv4,
-            provider=dns_provider,
-        )
+            if first_master:
+                first_master_vm = node_vm
+                first_master_ipv4 = node_ipv4
+                master_connection = command.remote.ConnectionArgs(
+                    host=first_master_ipv4,
+                    user=component_config.microk8s.ssh_user,
+                )
+                # not rolled, as the other nodes would not rejoin a cluster formed anew:
+                continue
+            if master_connection and first_master_ipv4:
+                # join further masters one after the other to let dqlite form its HA cluster
+                # safely, workers each with their own token so all joins can run concurrently:
+                joined = _join_node(
+                    component_config,
+                    node_config.name,
+                    node_vm=node_vm,
+                    node_ipv4=node_ipv4,
+                    master_connection=master_connection,
+                    master_ipv4=first_master_ipv4,
+                    worker=not master,
+                    depends_on=[previous_master_join] if master and previous_master_join else None,
+                )
+                if master:
+                    previous_master_join = joined
+            else:
+                continue
 
-        if not first_master_ipv4:
-            first_master_ipv4 = master_vm_ipv4
+            if rolling_update:
+                current_batch.append(
+                    _roll_node(
+                        component_config,
+                        node_config.name,
+                        node_vm=node_vm,
+                        master_connection=master_connection,
+                        depends_on=[joined],
+                    )
+                )
 
-    # configure cluster level properties:
-    if first_master_ipv4:
-        master_connection = command.remote.ConnectionArgs(
-            host=first_master_ipv4,
-            user=component_config.microk8s.ssh_user,
-        )
+        previous_batch = current_batch
 
+    cloud_config_rollout.finish()
+    p.export('boot-profiles', boot_profiles)
+
+    # configure cluster level properties:
+    if master_connection and first_master_vm:
+        # point clients to the VIP instead of the first master if available:
         kube_config_command = command.remote.Command(
             'kube-config',
             connection=master_connection,
             add_previous_output_in_env=False,
-            create='microk8s config',
+            create=(
+                'microk8s config | sed '
+                f"'s#server: https://.*:16443#server: https://{high_availability.api_vip}:16443#'"
+                if high_availability
+                else 'microk8s config'
+            ),
             # only log stderr and mark stdout as secret as it contains the private keys to cluster:
             logging=command.remote.Logging.STDERR,
+            # a replaced first master comes with a new cluster CA:
+            triggers=[first_master_vm.id],
             opts=p.ResourceOptions(additional_secret_outputs=['stdout']),
         )
 
@@ -194,11 +180,7 @@ def create_microk8s(component_config: ComponentConfig, proxmox_provider: proxmox
         # p stack output --show-secrets kube-config > ~/.kube/config
         p.export('kube-config', kube_config)
 
-        k8s_provider = k8s.Provider(
-            'microk8s',
-            kubeconfig=kube_config,
-            enable_server_side_apply=True,
-        )
+        k8s_provider = create_k8s_provider(kube_config)
 
         k8s_opts = p.ResourceOptions(provider=k8s_provider)
 
@@ -246,13 +228,362 @@ def create_microk8s(component_config: ComponentConfig, proxmox_provider: proxmox
             opts=k8s_opts,
         )
 
-        metallb = ensure_metallb(component_config, k8s_provider)
-        cert_manager = ensure_cert_manager(component_config, k8s_provider)
-        ensure_traefik(
+        ensure_components(
             component_config,
-            metallb=metallb,
-            cert_manager=cert_manager,
             k8s_provider=k8s_provider,
+            dns_records=dns_records,
+            master_connection=master_connection,
         )
 
-        ensure_csi_driver_smb(component_config, k8s_provider)
+    # sync DNS records of nodes and components at once:
+    dns_records.sync(component_config)
+
+
+def _create_node(
+    component_config: ComponentConfig,
+    node_config: VirtualMachineConfig,
+    *,
+    role: str,
+    first_master: bool,
+    placement_plan: PlacementPlan,
+    cloud_images: dict[str, proxmoxve.download.File],
+    node_templates: dict[str, p.Resource],
+    cloud_config_template: jinja2.Template,
+    cloud_config_rollout: CloudConfigRollout,
+    cloud_config_values: dict[str, typing.Any],
+    dns_records: DnsRecords,
+    depends_on: list[p.Resource],
+    proxmox_opts: p.ResourceOptions,
+) -> tuple[proxmoxve.vm.VirtualMachine, p.Output[str]]:
+    stack_name = p.get_stack()
+    rolling_update = component_config.microk8s.rolling_update is not None
+    node_name = placement_plan.virtual_machines[node_config.name]
+    node_template = node_templates.get(node_name)
+
+    rendered = cloud_config_template.render(
+        node_config.model_dump()
+        | {
+            'username': component_config.microk8s.ssh_user,
+            'ssh_public_key': component_config.microk8s.ssh_public_key,
+            'data_disk_mount': component_config.microk8s.data_disk_mount,
+            'containerd_data_disk': component_config.microk8s.containerd.data_disk,
+            'collect_boot_profiles': component_config.microk8s.collect_boot_profiles,
+            'kubelet_data_disk': component_config.microk8s.containerd.kubelet_data_disk,
+            'prepull_images': (
+                component_config.registry_cache.prepull_images
+                if component_config.registry_cache and component_config.is_enabled('registry_cache')
+                else []
+            ),
+            'prebaked': node_template is not None,
+            'node_tuning': (
+                component_config.microk8s.node_tuning.model_dump()
+                if component_config.microk8s.node_tuning
+                else None
+            ),
+            'microk8s_launch_config': _microk8s_launch_config(component_config, role),
+        }
+        | cloud_config_values
+    )
+
+    cloud_config_data = cloud_config_rollout.resolve(
+        node_config.name,
+        rendered,
+        # replacing the first master forms a new cluster, which the other nodes never rejoin:
+        frozen=rolling_update and first_master,
+    )
+    cloud_config = create_snippet(
+        f'cloud-config-{role}-{node_config.name}',
+        name=node_config.name,
+        node_name=node_name,
+        data=cloud_config_data,
+        opts=proxmox_opts,
+    )
+
+    gateway_address = str(node_config.ipv4_address.network.network_address + 1)
+
+    vlan_config: proxmoxve.vm.VirtualMachineNetworkDeviceArgsDict = (
+        {'vlan_id': int(component_config.microk8s.vlan_id)}
+        if component_config.microk8s.vlan_id
+        else {}
+    )
+
+    profile = component_config.microk8s.get_performance_profile(node_config.performance_profile)
+
+    # all tuning attributes are set explicitly, as the provider reads back Proxmox' defaults:
+    cpu: proxmoxve.vm.VirtualMachineCpuArgsDict = {
+        'cores': node_config.cores,
+        # use exact CPU flags of host, as migration of VM for k8s nodes is irrelevant:
+        'type': 'host',
+        'numa': profile.numa,
+    }
+    if profile.cpu_affinity:
+        cpu['affinity'] = profile.cpu_affinity
+
+    memory: proxmoxve.vm.VirtualMachineMemoryArgsDict = {
+        'dedicated': node_config.memory_mb_max,
+        'floating': node_config.memory_mb_min,
+    }
+    if profile.hugepages:
+        # hugepages cannot be ballooned:
+        memory |= {'floating': 0, 'hugepages': profile.hugepages, 'keep_hugepages': False}
+
+    root_disk = _disk('virtio0', node_config.root_disk_size_gb, profile)
+
+    # either clone the golden image or boot from the plain cloud image:
+    template_config = component_config.microk8s.node_template
+    if not template_config:
+        root_disk['file_id'] = cloud_images[node_name].id
+
+    clone: proxmoxve.vm.VirtualMachineCloneArgsDict | None = (
+        {
+            'vm_id': template_config.vmid + placement_plan.template_offset(node_name),
+            'full': not template_config.linked_clones,
+        }
+        if template_config
+        else None
+    )
+
+    node_vm = proxmoxve.vm.VirtualMachine(
+        node_config.name,
+        name=node_config.name,
+        node_name=node_name,
+        vm_id=node_config.vmid,
+        tags=[stack_name],
+        description=f'Kubernetes {role.capitalize()}, maintained with Pulumi.',
+        cpu=cpu,
+        memory=memory,
+        cdrom={'enabled': False},
+        clone=clone,
+        disks=[
+            root_disk,
+            _disk('virtio1', node_config.data_disk_size_gb, profile),
+            *(
+                [_disk('virtio2', node_config.local_pv_disk_size_gb, profile)]
+                if node_config.local_pv_disk_size_gb
+                else []
+            ),
+        ],
+        network_devices=[
+            {
+                'bridge': 'vmbr0',
+                'model': 'virtio',
+                'queues': node_config.cores if profile.network_multiqueue else 0,
+                **vlan_config,
+            }
+        ],
+        agent={'enabled': True},
+        initialization={
+            # TODO Turn into state IP address and setup DNS when config is refactored.
+            'ip_configs': [
+                {
+                    'ipv4': {
+                        'address': str(node_config.ipv4_address),
+                        'gateway': gateway_address,
+                    }
+                }
+            ],
+            'dns': {
+                'domain': 'local',
+                'servers': _get_dns_servers(component_config, gateway_address),
+            },
+            'user_data_file_id': cloud_config.id,
+        },
+        stop_on_destroy=True,
+        on_boot=stack_name == 'prod',
+        machine='q35',
+        # Linux 2.6+:
+        operating_system={'type': 'l26'},
+        opts=p.ResourceOptions.merge(
+            proxmox_opts,
+            p.ResourceOptions(
+                ignore_changes=['cdrom'],
+                depends_on=[*depends_on, node_template] if node_template else depends_on,
+                # the VM ID is reused, and dependent drain and join commands run before deletion:
+                delete_before_replace=rolling_update and not first_master,
+            ),
+        ),
+    )
+
+    cloud_config_rollout.record(node_config.name, cloud_config_data, node_vm)
+
+    node_vm_ipv4 = node_vm.ipv4_addresses[1][0]
+    p.export(f'{node_config.name}-ipv4', node_vm_ipv4)
+
+    # create DNS entries for nodes:
+    dns_records.add(f'{node_config.name}.{component_config.unify.internal_domain}', node_vm_ipv4)
+
+    return node_vm, node_vm_ipv4
+
+
+def _disk(
+    interface: str, size_gb: int, profile: PerformanceProfileConfig
+) -> proxmoxve.vm.VirtualMachineDiskArgsDict:
+    return {
+        'interface': interface,
+        'size': size_gb,
+        'iothread': True,
+        'discard': 'on',
+        'file_format': 'raw',
+        'aio': profile.disk_aio,
+        'cache': profile.disk_cache,
+        'ssd': profile.disk_ssd,
+        # hack to avoid diff in subsequent runs:
+        'speed': {
+            'read': 10000,
+        },
+    }
+
+
+def _rollout_batches(component_config: ComponentConfig) -> list[list[VirtualMachineConfig]]:
+    microk8s_config = component_config.microk8s
+    rolling_update = microk8s_config.rolling_update
+    if not rolling_update:
+        return [microk8s_config.nodes]
+
+    # masters one by one to keep the quorum of the control plane:
+    workers = microk8s_config.nodes[len(microk8s_config.master_nodes) :]
+    return [[master_config] for master_config in microk8s_config.master_nodes] + [
+        workers[index : index + rolling_update.max_unavailable]
+        for index in range(0, len(workers), rolling_update.max_unavailable)
+    ]
+
+
+def _microk8s_launch_config(component_config: ComponentConfig, role: str) -> dict[str, typing.Any]:
+    launch_config: dict[str, typing.Any] = {'version': '0.1.0'}
+
+    high_availability = component_config.microk8s.high_availability
+    if high_availability and role == 'master':
+        launch_config['extraSANs'] = [str(high_availability.api_vip)]
+
+    if registry_configs := get_containerd_registry_configs(component_config):
+        launch_config['containerdRegistryConfigs'] = registry_configs
+
+    containerd_config = component_config.microk8s.containerd
+    if containerd_config.data_disk:
+        launch_config['extraContainerdArgs'] = {
+            '--root': f'{component_config.microk8s.data_disk_mount}/containerd',
+        }
+
+    if containerd_config.snapshotter:
+        launch_config['extraContainerdEnv'] = {'SNAPSHOTTER': containerd_config.snapshotter}
+
+    kubelet_args = {
+        '--image-gc-high-threshold': containerd_config.image_gc_high_threshold_percent,
+        '--image-gc-low-threshold': containerd_config.image_gc_low_threshold_percent,
+    }
+    if node_tuning := component_config.microk8s.node_tuning:
+        kubelet_tuning = node_tuning.kubelet
+        kubelet_args |= {
+            '--max-pods': kubelet_tuning.max_pods,
+            '--system-reserved': _format_resources(kubelet_tuning.system_reserved),
+            '--kube-reserved': _format_resources(kubelet_tuning.kube_reserved),
+            '--cpu-manager-policy': kubelet_tuning.cpu_manager_policy,
+        }
+    if kubelet_args := {
+        key: str(value) for key, value in kubelet_args.items() if value is not None
+    }:
+        launch_config['extraKubeletArgs'] = kubelet_args
+
+    if node_tuning and 'net.netfilter.nf_conntrack_max' in node_tuning.sysctls:
+        # kube-proxy otherwise resets the conntrack table size to its own default on start:
+        launch_config['extraKubeProxyArgs'] = {'--conntrack-max-per-core': '0'}
+
+    return launch_config
+
+
+def _get_dns_servers(component_config: ComponentConfig, gateway_address: str) -> list[str]:
+    cluster_dns_config = component_config.cluster_dns
+    if (
+        cluster_dns_config
+        and component_config.is_enabled('cluster_dns')
+        and cluster_dns_config.node_local_dns
+        and cluster_dns_config.node_local_dns.node_resolver
+    ):
+        return [str(cluster_dns_config.node_local_dns.local_ipv4), gateway_address]
+    return [gateway_address]
+
+
+def _format_resources(resources: dict[str, str]) -> str | None:
+    return ','.join(f'{name}={quantity}' for name, quantity in resources.items()) or None
+
+
+def _join_node(
+    component_config: ComponentConfig,
+    node_name: str,
+    *,
+    node_vm: proxmoxve.vm.VirtualMachine,
+    node_ipv4: p.Output[str],
+    master_connection: command.remote.ConnectionArgs,
+    master_ipv4: p.Output[str],
+    worker: bool,
+    depends_on: list[p.Resource] | None = None,
+) -> p.Resource:
+    # a replaced VM leaves and rejoins the cluster:
+    triggers = [node_vm.id]
+
+    add_node = command.remote.Command(
+        f'{node_name}-add-node',
+        connection=master_connection,
+        add_previous_output_in_env=False,
+        create='microk8s add-node --token-ttl 3600 --format token',
+        delete=f'microk8s remove-node {node_name} --force',
+        # only log stderr and mark stdout as secret as it contains the join token:
+        logging=command.remote.Logging.STDERR,
+        triggers=triggers,
+        opts=p.ResourceOptions(additional_secret_outputs=['stdout'], depends_on=depends_on),
+    )
+
+    return command.remote.Command(
+        f'{node_name}-join',
+        connection=command.remote.ConnectionArgs(
+            host=node_ipv4,
+            user=component_config.microk8s.ssh_user,
+        ),
+        add_previous_output_in_env=False,
+        create=p.Output.concat(
+            'sudo microk8s join ',
+            master_ipv4,
+            ':25000/',
+            add_node.stdout,
+            ' --worker' if worker else '',
+        ),
+        delete='sudo microk8s leave',
+        logging=command.remote.Logging.STDERR,
+        triggers=triggers,
+    )
+
+
+def _roll_node(
+    component_config: ComponentConfig,
+    node_name: str,
+    *,
+    node_vm: proxmoxve.vm.VirtualMachine,
+    master_connection: command.remote.ConnectionArgs,
+    depends_on: list[p.Resource],
+) -> p.Resource:
+    rolling_update = component_config.microk8s.rolling_update
+    assert rolling_update, 'rolling update not configured'
+
+    kubectl = 'microk8s kubectl'
+    # replaced along with the VM: the delete drains the node before the VM goes away, the create
+    # waits for the new node to be Ready and uncordons it before the next batch is replaced:
+    return command.remote.Command(
+        f'{node_name}-rollout',
+        connection=master_connection,
+        add_previous_output_in_env=False,
+        create=(
+            f'timeout {rolling_update.ready_timeout_s} sh -c'
+            f' "until {kubectl} get node {node_name} > /dev/null 2>&1; do sleep 5; done"'
+            f' && {kubectl} wait --for=condition=Ready node/{node_name}'
+            f' --timeout={rolling_update.ready_timeout_s}s'
+            f' && {kubectl} uncordon {node_name}'
+        ),
+        delete=(
+            f'if {kubectl} get node {node_name} > /dev/null 2>&1;'
+            f' then {kubectl} drain {node_name} --ignore-daemonsets --delete-emptydir-data'
+            f' --timeout={rolling_update.drain_timeout_s}s; fi'
+        ),
+        logging=command.remote.Logging.STDERR,
+        triggers=[node_vm.id],
+        opts=p.ResourceOptions(depends_on=depends_on),
+    )
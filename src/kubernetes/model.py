@@ -2,6 +2,7 @@
 
 import ipaddress
 import os
+import typing
 
 import pulumi as p
 import pydantic
@@ -24,45 +25,504 @@ class EnvVarRef(ConfigBaseModel):
         return p.Output.secret(os.environ[self.envvar])
 
 
+class ProxmoxNodeCapacityConfig(ConfigBaseModel):
+    name: str
+    cores: pydantic.PositiveInt
+    memory_mb: pydantic.PositiveInt
+    storage_gb: pydantic.PositiveInt
+
+
+class PlacementConfig(ConfigBaseModel):
+    # snapshot of the cluster's node capacity, queried from the Proxmox API if not given:
+    nodes: list[ProxmoxNodeCapacityConfig] | None = None
+    datastore_id: str = 'local-lvm'
+    cpu_overcommit: pydantic.PositiveFloat = 4.0
+    # memory kept free on each node for the hypervisor and VMs not managed by this stack:
+    reserved_memory_mb: pydantic.NonNegativeInt = 4096
+
+
 class ProxmoxConfig(ConfigBaseModel):
+    # node used for all VMs unless placement is configured:
     node_name: str
     api_endpoint: pydantic.HttpUrl
     api_token: EnvVarRef
     verify_ssl: bool = True
+    placement: PlacementConfig | None = None
+
 
+class AddonConfig(ConfigBaseModel):
+    # allows keeping the config of a component while not installing it:
+    enabled: bool = True
 
-class CertManagerConfig(ConfigBaseModel):
+
+class HelmChartConfig(AddonConfig):
     version: str
+    # sha256 of the chart archive as listed in the repository index, checked on every run:
+    digest: str | None = pydantic.Field(default=None, pattern=r'^[0-9a-f]{64}$')
+
+
+class CertManagerConfig(HelmChartConfig):
     acme_email: pydantic.EmailStr
 
 
-class TraefikConfig(ConfigBaseModel):
+class ResourceRequirementsConfig(ConfigBaseModel):
+    # quantities by resource name, e.g. `cpu: 100m`:
+    requests: dict[str, str] = {}
+    limits: dict[str, str] = {}
+
+
+class AutoscalingConfig(ConfigBaseModel):
+    min_replicas: pydantic.PositiveInt = 2
+    max_replicas: pydantic.PositiveInt = 5
+    target_cpu_utilization_percent: int = pydantic.Field(default=80, gt=0, le=100)
+
+    @pydantic.model_validator(mode='after')
+    def _check_replicas(self) -> 'AutoscalingConfig':
+        if self.min_replicas > self.max_replicas:
+            raise ValueError('min-replicas must not exceed max-replicas')
+        return self
+
+
+class TraefikConfig(HelmChartConfig):
+    # fixed number of replicas, unless autoscaling is configured:
+    replicas: pydantic.PositiveInt = 1
+    autoscaling: AutoscalingConfig | None = None
+    resources: ResourceRequirementsConfig = ResourceRequirementsConfig(
+        requests={'cpu': '100m', 'memory': '128Mi'},
+        limits={'memory': '256Mi'},
+    )
+    # pods evicted at most at once by drains, e.g. during rolling updates of nodes:
+    max_unavailable: pydantic.PositiveInt = 1
+    # `Local` keeps client IPs and avoids the hop between nodes, MetalLB then only announces the
+    # service from nodes running a traefik pod:
+    external_traffic_policy: typing.Literal['Cluster', 'Local'] = 'Local'
+
+
+class MetricsServerConfig(HelmChartConfig):
+    pass
+
+
+class LoadTestThresholdsConfig(ConfigBaseModel):
+    max_p50_ms: pydantic.PositiveFloat | None = None
+    max_p95_ms: pydantic.PositiveFloat | None = None
+    max_p99_ms: pydantic.PositiveFloat | None = None
+    min_requests_per_second: pydantic.PositiveFloat | None = None
+    # share of requests not answered with HTTP 200:
+    max_error_ratio: float = pydantic.Field(default=0.0, ge=0, le=1)
+
+
+class LoadTestConfig(AddonConfig):
+    # host below `microk8s.sub-domain` the echo backend is served at:
+    host_prefix: str = 'load-test'
+    duration_s: pydantic.PositiveInt = 30
+    # target rate, 0 sends as fast as possible:
+    requests_per_second: pydantic.NonNegativeInt = 0
+    connections: pydantic.PositiveInt = 16
+    echo_replicas: pydantic.PositiveInt = 2
+    echo_image: str = 'docker.io/traefik/whoami:v1.10.3'
+    load_generator_image: str = 'docker.io/fortio/fortio:1.69.1'
+    curl_image: str = 'docker.io/curlimages/curl:8.12.1'
+    thresholds: LoadTestThresholdsConfig = pydantic.Field(default_factory=LoadTestThresholdsConfig)
+    # change to run the load test again:
+    run: int = 1
+
+
+class LocalPvConfig(HelmChartConfig):
+    # version of the topolvm chart:
     version: str
+    # share of the thin pool's size that may be provisioned in volumes:
+    overprovision_ratio: float = pydantic.Field(default=1.0, ge=1.0)
+    fs_type: typing.Literal['xfs', 'ext4'] = 'xfs'
+    # installs the CSI snapshot controller and CRDs to allow snapshots of thin volumes:
+    snapshot_controller: HelmChartConfig | None = None
+
+
+class StorageBenchmarkConfig(AddonConfig):
+    storage_classes: list[str] = ['data-hostpath']
+    # nodes to benchmark each storage class on, all nodes if not given:
+    nodes: list[str] | None = None
+    # fio block sizes, each used for sequential and random reads and writes:
+    block_sizes: list[str] = ['4k', '64k', '1m']
+    runtime_s: pydantic.PositiveInt = 20
+    size_gb: pydantic.PositiveInt = 2
+    iodepth: pydantic.PositiveInt = 16
+    # bypass the page cache, not supported by all file systems:
+    direct: bool = True
+    # image shipping fio, pinned to keep results comparable between runs:
+    image: str = 'docker.io/xridge/fio:3.38'
+    # change to run the benchmarks again:
+    run: int = 1
+
 
+class CoreDnsConfig(ConfigBaseModel):
+    replicas: pydantic.PositiveInt = 2
+    # maximum TTL of cached answers:
+    cache_ttl_s: pydantic.PositiveInt = 30
+    # refresh popular entries before they expire:
+    prefetch: bool = True
 
-class CsiDriverSmbConfig(ConfigBaseModel):
+
+class NodeLocalDnsConfig(ConfigBaseModel):
+    image: str = 'registry.k8s.io/dns/k8s-dns-node-cache:1.25.0'
+    # link-local address the cache listens on in addition to the cluster DNS service IP:
+    local_ipv4: ipaddress.IPv4Address = ipaddress.IPv4Address('169.254.20.10')
+    cache_ttl_s: pydantic.PositiveInt = 30
+    # let the nodes resolve via the cache, falling back to the router while it is not running:
+    node_resolver: bool = False
+
+
+class ClusterDnsConfig(AddonConfig):
+    # as given by microk8s:
+    service_ipv4: ipaddress.IPv4Address = ipaddress.IPv4Address('10.152.183.10')
+    cluster_domain: str = 'cluster.local'
+    # resolvers for names outside the cluster, the nodes' resolvers if not given:
+    upstream_servers: list[ipaddress.IPv4Address] = []
+    coredns: CoreDnsConfig = pydantic.Field(default_factory=CoreDnsConfig)
+    node_local_dns: NodeLocalDnsConfig | None = pydantic.Field(default_factory=NodeLocalDnsConfig)
+
+    @pydantic.model_validator(mode='after')
+    def _check_upstream_servers(self) -> 'ClusterDnsConfig':
+        # the cache would otherwise forward the nodes' queries to itself:
+        if self.node_local_dns and self.node_local_dns.node_resolver and not self.upstream_servers:
+            raise ValueError('node-local DNS as node resolver requires upstream-servers')
+        return self
+
+
+class MonitoringConfig(HelmChartConfig):
+    # version of the prometheus chart of prometheus-community:
     version: str
+    retention: str = '7d'
+    scrape_interval: str = '30s'
+    storage_size_gb: pydantic.PositiveInt = 10
+
+
+class SmbShareConfig(ConfigBaseModel):
+    # name of the storage class, volumes are created as subdirectories of the share:
+    name: str
+    # share in the form `//server/share`:
+    source: str = pydantic.Field(pattern=r'^//[^/]+/.+')
+    username: str
+    password: EnvVarRef
+    reclaim_policy: typing.Literal['Delete', 'Retain'] = 'Retain'
+    vers: str = '3.1.1'
+    # maximum size of reads and writes in bytes, larger sizes than the default 1 MiB help with
+    # streaming large files:
+    rsize: pydantic.PositiveInt = 4 * 1024 * 1024
+    wsize: pydantic.PositiveInt = 4 * 1024 * 1024
+    # `loose` caching avoids round trips for data not changed by other clients:
+    cache: typing.Literal['strict', 'loose', 'none'] = 'strict'
+    # seconds attributes are cached:
+    actimeo: pydantic.NonNegativeInt | None = 30
+    # spread traffic over several connections, if supported by server and network:
+    multichannel: bool = False
+    max_channels: pydantic.PositiveInt | None = None
+    # do not send byte range lock requests to the server:
+    nobrl: bool = True
+    uid: pydantic.NonNegativeInt | None = None
+    gid: pydantic.NonNegativeInt | None = None
+    file_mode: str = '0664'
+    dir_mode: str = '0775'
+    extra_mount_options: list[str] = []
+
+    @property
+    def mount_options(self) -> list[str]:
+        options = [
+            f'vers={self.vers}',
+            f'rsize={self.rsize}',
+            f'wsize={self.wsize}',
+            f'cache={self.cache}',
+            f'file_mode={self.file_mode}',
+            f'dir_mode={self.dir_mode}',
+        ]
+        if self.actimeo is not None:
+            options.append(f'actimeo={self.actimeo}')
+        if self.multichannel:
+            options.append('multichannel')
+            if self.max_channels:
+                options.append(f'max_channels={self.max_channels}')
+        if self.nobrl:
+            options.append('nobrl')
+        if self.uid is not None:
+            options += [f'uid={self.uid}', 'forceuid']
+        if self.gid is not None:
+            options += [f'gid={self.gid}', 'forcegid']
+        return options + self.extra_mount_options
+
+
+class CsiDriverSmbConfig(HelmChartConfig):
+    shares: list[SmbShareConfig] = []
+    controller_replicas: pydantic.PositiveInt = 1
+    # resources of the smb containers of controller and node pods:
+    controller_resources: ResourceRequirementsConfig | None = None
+    node_resources: ResourceRequirementsConfig | None = None
+
+
+class RegistryMirrorConfig(ConfigBaseModel):
+    # registry host name as used in image references:
+    registry: str
+    upstream_url: pydantic.HttpUrl
+    # port on every node under which containerd reaches the cache:
+    node_port: int = pydantic.Field(ge=30000, le=32767)
+    username: str | None = None
+    password: EnvVarRef | None = None
+
+
+class RegistryCacheConfig(AddonConfig):
+    image: str = 'docker.io/library/registry:2.8.3'
+    mirrors: list[RegistryMirrorConfig] = pydantic.Field(
+        default_factory=lambda: [
+            RegistryMirrorConfig(
+                registry='docker.io',
+                upstream_url=pydantic.HttpUrl('https://registry-1.docker.io'),
+                node_port=32001,
+            ),
+            RegistryMirrorConfig(
+                registry='quay.io',
+                upstream_url=pydantic.HttpUrl('https://quay.io'),
+                node_port=32002,
+            ),
+            RegistryMirrorConfig(
+                registry='ghcr.io',
+                upstream_url=pydantic.HttpUrl('https://ghcr.io'),
+                node_port=32003,
+            ),
+            RegistryMirrorConfig(
+                registry='registry.k8s.io',
+                upstream_url=pydantic.HttpUrl('https://registry.k8s.io'),
+                node_port=32004,
+            ),
+        ]
+    )
+    storage_size_gb: pydantic.PositiveInt = 20
+    # fully qualified image references pulled in the background when a node boots:
+    prepull_images: list[str] = []
 
 
 class CloudflareConfig(ConfigBaseModel):
     api_token: EnvVarRef
 
 
-class MetalLbConfig(ConfigBaseModel):
-    version: str
+class MetalLbBgpPeerConfig(ConfigBaseModel):
+    name: str
+    peer_address: ipaddress.IPv4Address
+    peer_asn: pydantic.PositiveInt
+    my_asn: pydantic.PositiveInt
+    # only nodes with these labels peer with the router, all nodes if empty:
+    node_selector: dict[str, str] = {}
+    password: EnvVarRef | None = None
+
+
+class MetalLbPoolConfig(ConfigBaseModel):
+    name: str
     ipv4_start: ipaddress.IPv4Address
     ipv4_end: ipaddress.IPv4Address
+    # `l2` answers ARP from a single node per IP, `bgp` announces the IPs from all nodes running
+    # the service, so that the router spreads traffic across them with ECMP:
+    mode: typing.Literal['l2', 'bgp'] = 'l2'
+    auto_assign: bool = True
+    # names of the BGP peers announcing the pool, all peers if empty:
+    peers: list[str] = []
 
 
-class VirtualMachineConfig(ConfigBaseModel):
-    name: str
-    vmid: pydantic.PositiveInt
-    ipv4_address: ipaddress.IPv4Interface
+class MetalLbConfig(HelmChartConfig):
+    # range of the default pool in L2 mode, if no pools are given:
+    ipv4_start: ipaddress.IPv4Address | None = None
+    ipv4_end: ipaddress.IPv4Address | None = None
+    # traefik takes its IP from the first pool:
+    pools: list[MetalLbPoolConfig] = []
+    bgp_peers: list[MetalLbBgpPeerConfig] = []
+
+    def get_pools(self) -> list[MetalLbPoolConfig]:
+        if self.pools:
+            return self.pools
+        assert self.ipv4_start and self.ipv4_end
+        return [
+            MetalLbPoolConfig(name='default', ipv4_start=self.ipv4_start, ipv4_end=self.ipv4_end)
+        ]
+
+    @pydantic.model_validator(mode='after')
+    def _check_pools(self) -> 'MetalLbConfig':
+        if not self.pools and not (self.ipv4_start and self.ipv4_end):
+            raise ValueError('metallb requires either pools or ipv4-start and ipv4-end')
+        if self.pools and (self.ipv4_start or self.ipv4_end):
+            raise ValueError('metallb ipv4-start and ipv4-end cannot be combined with pools')
+
+        peer_names = {peer.name for peer in self.bgp_peers}
+        for pool in self.pools:
+            if pool.mode == 'bgp' and not self.bgp_peers:
+                raise ValueError(f'metallb pool {pool.name} in BGP mode requires bgp-peers')
+            if unknown := set(pool.peers) - peer_names:
+                raise ValueError(f'unknown BGP peers of metallb pool {pool.name}: {unknown}')
+
+        return self
+
+
+class PerformanceProfileConfig(ConfigBaseModel):
+    numa: bool = False
+    # hugepage size in MiB backing the VM memory, disables memory ballooning:
+    hugepages: typing.Literal['2', '1024', 'any'] | None = None
+    # host CPUs to pin the VM to, e.g. "0-3,8-11" (requires root@pam API access):
+    cpu_affinity: str | None = None
+    # one virtio-net queue per core:
+    network_multiqueue: bool = False
+    disk_aio: typing.Literal['io_uring', 'native', 'threads'] = 'io_uring'
+    disk_cache: typing.Literal['none', 'directsync', 'writethrough', 'writeback', 'unsafe'] = 'none'
+    disk_ssd: bool = False
+
+    @pydantic.model_validator(mode='after')
+    def _check_aio(self) -> 'PerformanceProfileConfig':
+        if self.disk_aio == 'native' and self.disk_cache not in ('none', 'directsync'):
+            raise ValueError('native disk AIO requires disk cache mode none or directsync')
+        return self
+
+
+# the default profile matches the Proxmox defaults:
+DEFAULT_PERFORMANCE_PROFILES = {
+    'default': PerformanceProfileConfig(),
+    'throughput': PerformanceProfileConfig(
+        numa=True,
+        network_multiqueue=True,
+        disk_aio='native',
+        disk_cache='none',
+        disk_ssd=True,
+    ),
+}
+
+
+class VirtualMachineShapeConfig(ConfigBaseModel):
     cores: pydantic.PositiveInt
     memory_mb_min: pydantic.PositiveInt
     memory_mb_max: pydantic.PositiveInt
     root_disk_size_gb: pydantic.PositiveInt
     data_disk_size_gb: pydantic.PositiveInt
+    # raw disk for LVM thin volumes provisioned by TopoLVM, see `LocalPvConfig`:
+    local_pv_disk_size_gb: pydantic.PositiveInt | None = None
+    performance_profile: str = 'default'
+
+    @property
+    def total_disk_size_gb(self) -> int:
+        return self.root_disk_size_gb + self.data_disk_size_gb + (self.local_pv_disk_size_gb or 0)
+
+
+class VirtualMachineConfig(VirtualMachineShapeConfig):
+    name: str
+    vmid: pydantic.PositiveInt
+    ipv4_address: ipaddress.IPv4Interface
+    # pin VM to a Proxmox node instead of letting the placement decide:
+    node_name: str | None = None
+
+
+class WorkerPoolConfig(VirtualMachineShapeConfig):
+    name: str
+    count: pydantic.NonNegativeInt
+    # nodes get consecutive VM IDs and IP addresses starting with these:
+    vmid_start: pydantic.PositiveInt
+    ipv4_address_start: ipaddress.IPv4Interface
+
+    @pydantic.model_validator(mode='after')
+    def _check_ipv4_range(self) -> 'WorkerPoolConfig':
+        last_ipv4 = self.ipv4_address_start.ip + max(self.count - 1, 0)
+        if last_ipv4 not in self.ipv4_address_start.network:
+            raise ValueError(f'worker pool {self.name} exceeds network of its IP addresses')
+        return self
+
+    @property
+    def nodes(self) -> list[VirtualMachineConfig]:
+        shape = self.model_dump(include=set(VirtualMachineShapeConfig.model_fields))
+        return [
+            VirtualMachineConfig(
+                name=f'{self.name}-{index}',
+                vmid=self.vmid_start + index,
+                ipv4_address=ipaddress.IPv4Interface(
+                    (self.ipv4_address_start.ip + index, self.ipv4_address_start.network.prefixlen)
+                ),
+                **shape,
+            )
+            for index in range(self.count)
+        ]
+
+
+class NodeTemplateConfig(ConfigBaseModel):
+    # bump version (and vmid) to rebuild the template, e.g. to pick up a newer cloud image:
+    version: str = pydantic.Field(pattern=r'^[a-z0-9][a-z0-9-]*$')
+    vmid: pydantic.PositiveInt
+    ipv4_address: ipaddress.IPv4Interface
+    root_disk_size_gb: pydantic.PositiveInt = 16
+    linked_clones: bool = True
+
+
+class HighAvailabilityConfig(ConfigBaseModel):
+    # floating IP address of the API server, held by keepalived on one of the masters:
+    api_vip: ipaddress.IPv4Address
+    vrrp_router_id: int = pydantic.Field(default=51, ge=1, le=255)
+
+
+class KubeletTuningConfig(ConfigBaseModel):
+    max_pods: pydantic.PositiveInt | None = None
+    # resources kept from pods, e.g. `cpu: 500m`:
+    system_reserved: dict[str, str] = {}
+    kube_reserved: dict[str, str] = {}
+    # `static` gives guaranteed pods with integer CPU requests exclusive cores:
+    cpu_manager_policy: typing.Literal['none', 'static'] | None = None
+
+    @pydantic.model_validator(mode='after')
+    def _check_cpu_manager_policy(self) -> 'KubeletTuningConfig':
+        if self.cpu_manager_policy == 'static' and not (
+            'cpu' in self.system_reserved or 'cpu' in self.kube_reserved
+        ):
+            raise ValueError('static CPU manager policy requires reserved CPU')
+        return self
+
+
+class NodeTuningConfig(ConfigBaseModel):
+    sysctls: dict[str, str | int] = {
+        # busy nodes with many connections, e.g. running ingress or load balancers:
+        'net.netfilter.nf_conntrack_max': 524288,
+        'net.core.somaxconn': 4096,
+        'net.ipv4.tcp_max_syn_backlog': 4096,
+        # many pods watching files, e.g. config reloaders:
+        'fs.inotify.max_user_watches': 524288,
+        'fs.inotify.max_user_instances': 8192,
+        # e.g. required by elasticsearch:
+        'vm.max_map_count': 262144,
+    }
+    # only applied if the VM exposes frequency scaling:
+    cpu_governor: typing.Literal['performance', 'schedutil', 'ondemand', 'powersave'] | None = (
+        'performance'
+    )
+    transparent_hugepages: typing.Literal['always', 'madvise', 'never'] | None = 'madvise'
+    kubelet: KubeletTuningConfig = pydantic.Field(default_factory=KubeletTuningConfig)
+
+
+class ContainerdConfig(ConfigBaseModel):
+    # keep image layers and snapshots on the data disk instead of the root disk:
+    data_disk: bool = False
+    # also keep kubelet state (pod volumes) and pod logs on the data disk:
+    kubelet_data_disk: bool = False
+    snapshotter: typing.Literal['overlayfs', 'native', 'zfs', 'btrfs'] | None = None
+    image_gc_high_threshold_percent: int | None = pydantic.Field(default=None, ge=0, le=100)
+    image_gc_low_threshold_percent: int | None = pydantic.Field(default=None, ge=0, le=100)
+
+    @pydantic.model_validator(mode='after')
+    def _check_image_gc_thresholds(self) -> 'ContainerdConfig':
+        if (
+            self.image_gc_high_threshold_percent is not None
+            and self.image_gc_low_threshold_percent is not None
+            and self.image_gc_low_threshold_percent > self.image_gc_high_threshold_percent
+        ):
+            raise ValueError('image GC low threshold must not exceed the high threshold')
+        return self
+
+
+class RollingUpdateConfig(ConfigBaseModel):
+    # The first master forms the cluster, which the other nodes would not rejoin if it was
+    # replaced. It is hence never replaced by rolling updates: a changed cloud-config of it fails
+    # the update instead, until the cluster is rebuilt by hand.
+
+    # number of workers replaced at the same time, masters are always replaced one by one:
+    max_unavailable: pydantic.PositiveInt = 1
+    drain_timeout_s: pydantic.PositiveInt = 600
+    ready_timeout_s: pydantic.PositiveInt = 900
 
 
 class MicroK8sConfig(ConfigBaseModel):
@@ -75,9 +535,57 @@ class MicroK8sConfig(ConfigBaseModel):
     ssh_public_key: str
     vlan_id: pydantic.PositiveInt | None = None
     master_nodes: list[VirtualMachineConfig]
+    worker_pools: list[WorkerPoolConfig] = []
+    node_template: NodeTemplateConfig | None = None
+    high_availability: HighAvailabilityConfig | None = None
+    # additional profiles, extending or overriding the default profiles:
+    performance_profiles: dict[str, PerformanceProfileConfig] = {}
     data_disk_mount: str = '/mnt/data'
+    containerd: ContainerdConfig = pydantic.Field(default_factory=ContainerdConfig)
+    # kernel and kubelet settings applied before microk8s starts:
+    node_tuning: NodeTuningConfig | None = None
+    # drain and replace nodes batch by batch instead of all at once:
+    rolling_update: RollingUpdateConfig | None = None
+    # record the boot steps of each node and export their timings as stack output:
+    collect_boot_profiles: bool = False
+    # number of nodes to roll a changed cloud-config out to per run, all at once if unset:
+    cloud_config_batch_size: pydantic.PositiveInt | None = None
     sub_domain: str | None = None
 
+    @property
+    def nodes(self) -> list[VirtualMachineConfig]:
+        return self.master_nodes + [
+            worker for pool_config in self.worker_pools for worker in pool_config.nodes
+        ]
+
+    def get_performance_profile(self, name: str) -> PerformanceProfileConfig:
+        return (DEFAULT_PERFORMANCE_PROFILES | self.performance_profiles)[name]
+
+    @pydantic.model_validator(mode='after')
+    def _check_performance_profiles(self) -> 'MicroK8sConfig':
+        profiles = DEFAULT_PERFORMANCE_PROFILES | self.performance_profiles
+        for node in self.nodes:
+            if node.performance_profile not in profiles:
+                raise ValueError(
+                    f'unknown performance profile {node.performance_profile} of node {node.name}'
+                )
+        return self
+
+    @pydantic.model_validator(mode='after')
+    def _check_unique_nodes(self) -> 'MicroK8sConfig':
+        nodes = self.nodes
+        for attribute in ('name', 'vmid', 'ipv4_address'):
+            values = [getattr(node, attribute) for node in nodes]
+            if len(set(values)) != len(values):
+                raise ValueError(f'node {attribute} values must be unique across all nodes')
+        return self
+
+    @pydantic.model_validator(mode='after')
+    def _check_high_availability(self) -> 'MicroK8sConfig':
+        if self.high_availability and len(self.master_nodes) < 3:
+            raise ValueError('high availability requires at least 3 master nodes')
+        return self
+
 
 class UnifyConfig(ConfigBaseModel):
     url: pydantic.HttpUrl = pydantic.HttpUrl('https://unifi/')
@@ -88,9 +596,57 @@ class UnifyConfig(ConfigBaseModel):
 class ComponentConfig(ConfigBaseModel):
     proxmox: ProxmoxConfig
     microk8s: MicroK8sConfig
-    cloudflare: CloudflareConfig
-    metallb: MetalLbConfig
-    cert_manager: CertManagerConfig
-    traefik: TraefikConfig
+    cloudflare: CloudflareConfig | None = None
     unify: UnifyConfig = pydantic.Field(default_factory=UnifyConfig)
-    csi_driver_smb: CsiDriverSmbConfig
+    # optional components, see `kubernetes.components`:
+    metallb: MetalLbConfig | None = None
+    cert_manager: CertManagerConfig | None = None
+    traefik: TraefikConfig | None = None
+    metrics_server: MetricsServerConfig | None = None
+    monitoring: MonitoringConfig | None = None
+    local_pv: LocalPvConfig | None = None
+    storage_benchmark: StorageBenchmarkConfig | None = None
+    cluster_dns: ClusterDnsConfig | None = None
+    load_test: LoadTestConfig | None = None
+    csi_driver_smb: CsiDriverSmbConfig | None = None
+    registry_cache: RegistryCacheConfig | None = None
+
+    def is_enabled(self, name: str) -> bool:
+        addon_config: AddonConfig | None = getattr(self, name)
+        return addon_config is not None and addon_config.enabled
+
+    @pydantic.model_validator(mode='after')
+    def _check_cloudflare(self) -> 'ComponentConfig':
+        if self.is_enabled('cert_manager') and not self.cloudflare:
+            raise ValueError('cert-manager requires cloudflare config for DNS-01 challenges')
+        return self
+
+    @pydantic.model_validator(mode='after')
+    def _check_metrics_server(self) -> 'ComponentConfig':
+        if (
+            self.traefik
+            and self.traefik.enabled
+            and self.traefik.autoscaling
+            and not self.is_enabled('metrics_server')
+        ):
+            raise ValueError('autoscaling of traefik requires metrics-server')
+        return self
+
+    @pydantic.model_validator(mode='after')
+    def _check_load_test(self) -> 'ComponentConfig':
+        if self.is_enabled('load_test') and not self.microk8s.sub_domain:
+            raise ValueError(
+                'load test requires microk8s.sub-domain to route traffic through traefik'
+            )
+        return self
+
+    @pydantic.model_validator(mode='after')
+    def _check_local_pv(self) -> 'ComponentConfig':
+        if self.is_enabled('local_pv'):
+            if missing := [
+                node.name for node in self.microk8s.nodes if not node.local_pv_disk_size_gb
+            ]:
+                raise ValueError(f'local PVs require local-pv-disk-size-gb on nodes {missing}')
+            if not self.is_enabled('cert_manager'):
+                raise ValueError('local PVs require cert-manager for the TopoLVM webhook')
+        return self
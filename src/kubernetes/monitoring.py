@@ -0,0 +1,58 @@
+"""Installation of Prometheus, scraping nodes and the metrics of the components."""
+
+import pathlib
+
+import pulumi as p
+import pulumi_kubernetes as k8s
+import yaml
+
+from kubernetes.charts import get_chart
+from kubernetes.components import ComponentContext
+
+RECORDING_RULES_PATH = pathlib.Path('assets/monitoring/recording-rules.yaml')
+
+
+def ensure_monitoring(context: ComponentContext) -> p.Resource:
+    monitoring_config = context.component_config.monitoring
+    assert monitoring_config, 'monitoring not configured'
+    k8s_provider = context.k8s_provider
+
+    ns = k8s.core.v1.Namespace(
+        'monitoring',
+        metadata={
+            'name': 'monitoring',
+        },
+        opts=p.ResourceOptions(provider=k8s_provider),
+    )
+
+    # the prometheus chart scrapes pods by their `prometheus.io/*` annotations, so that no
+    # operator and CRDs are needed:
+    return k8s.helm.v3.Release(
+        'prometheus',
+        chart=get_chart(
+            'prometheus',
+            repo='https://prometheus-community.github.io/helm-charts',
+            chart_config=monitoring_config,
+        ),
+        namespace=ns.metadata.name,
+        values={
+            'server': {
+                'retention': monitoring_config.retention,
+                'global': {
+                    'scrape_interval': monitoring_config.scrape_interval,
+                    'evaluation_interval': monitoring_config.scrape_interval,
+                },
+                'persistentVolume': {
+                    'storageClass': 'data-hostpath',
+                    'size': f'{monitoring_config.storage_size_gb}Gi',
+                },
+            },
+            'serverFiles': {
+                'recording_rules.yml': yaml.safe_load(RECORDING_RULES_PATH.read_text()),
+            },
+            # nothing to alert to yet:
+            'alertmanager': {'enabled': False},
+            'prometheus-pushgateway': {'enabled': False},
+        },
+        opts=p.ResourceOptions(provider=k8s_provider),
+    )
@@ -0,0 +1,125 @@
+"""Golden image template for microk8s nodes."""
+
+import ipaddress
+
+import pulumi as p
+import pulumi_command as command
+import pulumi_proxmoxve as proxmoxve
+
+from kubernetes.cloud_config import create_snippet
+from kubernetes.model import ComponentConfig
+from kubernetes.templates import load_template
+
+
+def create_node_template(
+    component_config: ComponentConfig,
+    *,
+    node_name: str,
+    offset: int,
+    cloud_image: proxmoxve.download.File,
+    proxmox_provider: proxmoxve.Provider,
+) -> p.Resource:
+    template_config = component_config.microk8s.node_template
+    assert template_config, 'node template not configured'
+
+    proxmox_opts = p.ResourceOptions(provider=proxmox_provider)
+
+    # linked clones require a template on the same Proxmox node, hence one template per node:
+    vmid = template_config.vmid + offset
+    ipv4_address = ipaddress.IPv4Interface(
+        (template_config.ipv4_address.ip + offset, template_config.ipv4_address.network.prefixlen)
+    )
+    name = f'microk8s-template-{template_config.version}'
+    if node_name != component_config.proxmox.node_name:
+        name = f'{name}-{node_name}'
+
+    cloud_config = create_snippet(
+        f'cloud-config-{name}',
+        name=name,
+        node_name=node_name,
+        data=load_template('cloud-init', 'template-config.yaml').render(name=name),
+        opts=proxmox_opts,
+    )
+
+    gateway_address = str(ipv4_address.network.network_address + 1)
+
+    vlan_config: proxmoxve.vm.VirtualMachineNetworkDeviceArgsDict = (
+        {'vlan_id': int(component_config.microk8s.vlan_id)}
+        if component_config.microk8s.vlan_id
+        else {}
+    )
+
+    template_vm = proxmoxve.vm.VirtualMachine(
+        name,
+        name=name,
+        node_name=node_name,
+        vm_id=vmid,
+        tags=[p.get_stack(), 'template'],
+        description='Kubernetes node template, maintained with Pulumi.',
+        cpu={
+            'cores': 2,
+            'type': 'host',
+        },
+        memory={
+            'dedicated': 2048,
+        },
+        cdrom={'enabled': False},
+        disks=[
+            {
+                'interface': 'virtio0',
+                'size': template_config.root_disk_size_gb,
+                'file_id': cloud_image.id,
+                'iothread': True,
+                'discard': 'on',
+                'file_format': 'raw',
+            },
+        ],
+        network_devices=[
+            {
+                'bridge': 'vmbr0',
+                'model': 'virtio',
+                **vlan_config,
+            }
+        ],
+        # the VM powers itself off after provisioning, so there is no agent to wait for:
+        agent={'enabled': False},
+        initialization={
+            'ip_configs': [
+                {
+                    'ipv4': {
+                        'address': str(ipv4_address),
+                        'gateway': gateway_address,
+                    }
+                }
+            ],
+            'dns': {
+                'domain': 'local',
+                'servers': [gateway_address],
+            },
+            'user_data_file_id': cloud_config.id,
+        },
+        machine='q35',
+        operating_system={'type': 'l26'},
+        opts=p.ResourceOptions.merge(
+            proxmox_opts,
+            # the VM is turned into a stopped template with renamed base disk outside of Pulumi:
+            p.ResourceOptions(ignore_changes=['cdrom', 'disks', 'started', 'template']),
+        ),
+    )
+
+    # wait for cloud-init to power off the VM, then convert it via the API of the cluster node
+    # Pulumi talks to, which works for VMs on any node; clones must depend on this command:
+    vm_path = f'/nodes/{node_name}/qemu/{vmid}'
+    return command.remote.Command(
+        f'{name}-convert',
+        connection=command.remote.ConnectionArgs(
+            host=str(component_config.proxmox.api_endpoint.host),
+            user='root',
+        ),
+        create=(
+            f'timeout 1800 sh -c "until pvesh get {vm_path}/status/current --output-format yaml'
+            f" | grep -q '^status: stopped'; do sleep 10; done\""
+            f' && pvesh create {vm_path}/template'
+        ),
+        opts=p.ResourceOptions(depends_on=[template_vm]),
+    )
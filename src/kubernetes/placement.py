@@ -0,0 +1,226 @@
+"""Placement of node VMs across the nodes of a Proxmox cluster."""
+
+import dataclasses
+import json
+import pathlib
+
+import pulumi as p
+import pulumi_proxmoxve as proxmoxve
+
+from kubernetes.model import ComponentConfig, PlacementConfig, VirtualMachineConfig
+
+PLACEMENT_DIR = pathlib.Path('placement')
+
+MIB = 1024**2
+GIB = 1024**3
+
+
+@dataclasses.dataclass
+class NodeCapacity:
+    name: str
+    cores: float
+    memory_mb: int
+    storage_gb: int
+    masters: int = 0
+
+    def fits(self, vm_config: VirtualMachineConfig) -> bool:
+        return (
+            vm_config.cores <= self.cores
+            and vm_config.memory_mb_max <= self.memory_mb
+            and vm_config.total_disk_size_gb <= self.storage_gb
+        )
+
+    def allocate(self, vm_config: VirtualMachineConfig, *, master: bool):
+        self.cores -= vm_config.cores
+        self.memory_mb -= vm_config.memory_mb_max
+        self.storage_gb -= vm_config.total_disk_size_gb
+        self.masters += int(master)
+
+
+@dataclasses.dataclass
+class PlacementPlan:
+    # Proxmox node of each VM by VM name:
+    virtual_machines: dict[str, str]
+    # offset to VM ID and IP address of the node template on each Proxmox node:
+    templates: dict[str, int]
+
+    @property
+    def node_names(self) -> list[str]:
+        return sorted(set(self.virtual_machines.values()))
+
+    def template_offset(self, node_name: str) -> int:
+        if node_name not in self.templates:
+            self.templates[node_name] = max(self.templates.values(), default=-1) + 1
+        return self.templates[node_name]
+
+
+def get_placement_plan(
+    component_config: ComponentConfig, proxmox_provider: proxmoxve.Provider
+) -> PlacementPlan:
+    vm_configs = component_config.microk8s.nodes
+    placement_config = component_config.proxmox.placement
+
+    if not placement_config:
+        node_name = component_config.proxmox.node_name
+        return PlacementPlan(
+            virtual_machines={
+                vm_config.name: vm_config.node_name or node_name for vm_config in vm_configs
+            },
+            templates={node_name: 0},
+        )
+
+    # earlier decisions are stored with the code and never revised, so VMs never move around:
+    plan_path = PLACEMENT_DIR / f'{p.get_stack()}.json'
+    previous = (
+        PlacementPlan(**json.loads(plan_path.read_text()))
+        if plan_path.exists()
+        else PlacementPlan(
+            virtual_machines=_get_existing_placement(vm_configs, proxmox_provider),
+            templates={},
+        )
+    )
+
+    plan = PlacementPlan(
+        virtual_machines=place_virtual_machines(
+            vm_configs,
+            master_names={vm_config.name for vm_config in component_config.microk8s.master_nodes},
+            capacities=_get_capacities(placement_config, proxmox_provider),
+            previous=previous.virtual_machines,
+        ),
+        templates=previous.templates,
+    )
+
+    if component_config.microk8s.node_template:
+        for node_name in plan.node_names:
+            plan.template_offset(node_name)
+
+    if not p.runtime.is_dry_run():
+        PLACEMENT_DIR.mkdir(exist_ok=True)
+        plan_path.write_text(json.dumps(dataclasses.asdict(plan), indent=2, sort_keys=True) + '\n')
+
+    p.export('placement', plan.virtual_machines)
+    return plan
+
+
+def place_virtual_machines(
+    vm_configs: list[VirtualMachineConfig],
+    *,
+    master_names: set[str],
+    capacities: list[NodeCapacity],
+    previous: dict[str, str],
+) -> dict[str, str]:
+    """Assign VMs to Proxmox nodes, spreading load and masters over the nodes.
+
+    VMs keep the node they were placed on before or pinned to, remaining VMs are placed largest
+    first on the node with most free memory that can hold them, masters preferring nodes without
+    another master.
+    """
+    capacity_by_name = {capacity.name: capacity for capacity in capacities}
+    placement: dict[str, str] = {}
+
+    unplaced = []
+    for vm_config in vm_configs:
+        if vm_config.node_name and vm_config.node_name not in capacity_by_name:
+            raise ValueError(
+                f'VM {vm_config.name} is pinned to Proxmox node {vm_config.node_name},'
+                ' which is offline or unknown'
+            )
+
+        node_name = vm_config.node_name or previous.get(vm_config.name)
+        if node_name in capacity_by_name:
+            placement[vm_config.name] = node_name
+            capacity_by_name[node_name].allocate(vm_config, master=vm_config.name in master_names)
+        else:
+            unplaced.append(vm_config)
+
+    unplaced.sort(
+        key=lambda vm_config: (
+            vm_config.name not in master_names,
+            -vm_config.memory_mb_max,
+            -vm_config.cores,
+            vm_config.name,
+        )
+    )
+
+    for vm_config in unplaced:
+        master = vm_config.name in master_names
+        candidates = [capacity for capacity in capacities if capacity.fits(vm_config)]
+        if not candidates:
+            raise ValueError(f'no Proxmox node has enough capacity left for VM {vm_config.name}')
+
+        best = min(
+            candidates,
+            key=lambda capacity: (
+                capacity.masters if master else 0,
+                -capacity.memory_mb,
+                -capacity.cores,
+                capacity.name,
+            ),
+        )
+        placement[vm_config.name] = best.name
+        best.allocate(vm_config, master=master)
+
+    return placement
+
+
+def _get_existing_placement(
+    vm_configs: list[VirtualMachineConfig], proxmox_provider: proxmoxve.Provider
+) -> dict[str, str]:
+    """Return the Proxmox node of VMs deployed before placement was enabled."""
+    vm_names = {vm_config.vmid: vm_config.name for vm_config in vm_configs}
+    virtual_machines = proxmoxve.vm.get_virtual_machines(
+        opts=p.InvokeOptions(provider=proxmox_provider)
+    ).vms
+    return {
+        vm_names[vm.vm_id]: vm.node_name
+        for vm in virtual_machines or []
+        if vm.vm_id in vm_names and not vm.template
+    }
+
+
+def _get_capacities(
+    placement_config: PlacementConfig, proxmox_provider: proxmoxve.Provider
+) -> list[NodeCapacity]:
+    if placement_config.nodes:
+        return [
+            NodeCapacity(
+                name=node_config.name,
+                cores=node_config.cores * placement_config.cpu_overcommit,
+                memory_mb=node_config.memory_mb - placement_config.reserved_memory_mb,
+                storage_gb=node_config.storage_gb,
+            )
+            for node_config in placement_config.nodes
+        ]
+
+    invoke_opts = p.InvokeOptions(provider=proxmox_provider)
+    nodes = proxmoxve.cluster.get_nodes(opts=invoke_opts)
+
+    capacities = []
+    for name, cpu_count, memory_available, memory_used, online in zip(
+        nodes.names,
+        nodes.cpu_counts,
+        nodes.memory_availables,
+        nodes.memory_useds,
+        nodes.onlines,
+        strict=True,
+    ):
+        if not online:
+            continue
+
+        datastores = proxmoxve.storage.get_datastores(node_name=name, opts=invoke_opts)
+        storage_totals = dict(
+            zip(datastores.datastore_ids, datastores.space_totals, strict=True),
+        )
+
+        capacities.append(
+            NodeCapacity(
+                name=name,
+                cores=cpu_count * placement_config.cpu_overcommit,
+                # total memory, as VMs of this stack are accounted for by the placement itself:
+                memory_mb=(memory_available + memory_used) // MIB
+                - placement_config.reserved_memory_mb,
+                storage_gb=storage_totals.get(placement_config.datastore_id, 0) // GIB,
+            )
+        )
+
+    return sorted(capacities, key=lambda capacity: capacity.name)
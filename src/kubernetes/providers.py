@@ -0,0 +1,13 @@
+"""Providers shared by all components of the stack."""
+
+import pulumi as p
+import pulumi_kubernetes as k8s
+
+
+def create_k8s_provider(kube_config: p.Input[str]) -> k8s.Provider:
+    # single cluster scoped provider, all namespaced resources name their namespace explicitly:
+    return k8s.Provider(
+        'microk8s',
+        kubeconfig=kube_config,
+        enable_server_side_apply=True,
+    )
@@ -0,0 +1,144 @@
+"""Installation of pull-through caches for container registries."""
+
+import pulumi as p
+import pulumi_kubernetes as k8s
+
+from kubernetes.components import ComponentContext
+from kubernetes.model import RegistryMirrorConfig
+
+
+def ensure_registry_cache(context: ComponentContext) -> p.Resource:
+    registry_cache_config = context.component_config.registry_cache
+    assert registry_cache_config, 'registry cache not configured'
+    k8s_provider = context.k8s_provider
+
+    ns = k8s.core.v1.Namespace(
+        'registry-cache',
+        metadata={
+            'name': 'registry-cache',
+        },
+        opts=p.ResourceOptions(provider=k8s_provider),
+    )
+
+    k8s_opts = p.ResourceOptions(provider=k8s_provider)
+
+    # the registry can only proxy a single upstream, hence one cache per upstream registry:
+    for mirror_config in registry_cache_config.mirrors:
+        _create_mirror(
+            mirror_config,
+            image=registry_cache_config.image,
+            storage_size_gb=registry_cache_config.storage_size_gb,
+            namespace=ns.metadata.name,
+            k8s_opts=k8s_opts,
+        )
+
+    return ns
+
+
+def _create_mirror(
+    mirror_config: RegistryMirrorConfig,
+    *,
+    image: str,
+    storage_size_gb: int,
+    namespace: p.Input[str],
+    k8s_opts: p.ResourceOptions,
+):
+    name = f'cache-{mirror_config.registry.replace(".", "-")}'
+    labels = {'app': name}
+
+    env: list[k8s.core.v1.EnvVarArgsDict] = [
+        {'name': 'REGISTRY_PROXY_REMOTEURL', 'value': str(mirror_config.upstream_url)},
+        # allow the proxy to expire cached blobs:
+        {'name': 'REGISTRY_STORAGE_DELETE_ENABLED', 'value': 'true'},
+    ]
+
+    if mirror_config.username and mirror_config.password:
+        credentials = k8s.core.v1.Secret(
+            f'{name}-credentials',
+            metadata={'namespace': namespace},
+            type='Opaque',
+            string_data={
+                'username': mirror_config.username,
+                'password': mirror_config.password.value,
+            },
+            opts=k8s_opts,
+        )
+        for key in ('username', 'password'):
+            env.append(
+                {
+                    'name': f'REGISTRY_PROXY_{key.upper()}',
+                    'value_from': {
+                        'secret_key_ref': {'name': credentials.metadata.name, 'key': key},
+                    },
+                }
+            )
+
+    storage = k8s.core.v1.PersistentVolumeClaim(
+        name,
+        metadata={
+            'name': name,
+            'namespace': namespace,
+            # volume binds only once the registry pod is scheduled:
+            'annotations': {'pulumi.com/skipAwait': 'true'},
+        },
+        spec={
+            'access_modes': ['ReadWriteOnce'],
+            'storage_class_name': 'data-hostpath',
+            'resources': {'requests': {'storage': f'{storage_size_gb}Gi'}},
+        },
+        opts=k8s_opts,
+    )
+
+    k8s.apps.v1.Deployment(
+        name,
+        metadata={'name': name, 'namespace': namespace},
+        spec={
+            'replicas': 1,
+            'selector': {'match_labels': labels},
+            # the volume can only be mounted by one pod:
+            'strategy': {'type': 'Recreate'},
+            'template': {
+                'metadata': {'labels': labels},
+                'spec': {
+                    'containers': [
+                        {
+                            'name': 'registry',
+                            'image': image,
+                            'env': env,
+                            'ports': [{'name': 'registry', 'container_port': 5000}],
+                            'readiness_probe': {'http_get': {'path': '/', 'port': 'registry'}},
+                            'volume_mounts': [
+                                {'name': 'storage', 'mount_path': '/var/lib/registry'},
+                            ],
+                        }
+                    ],
+                    'volumes': [
+                        {
+                            'name': 'storage',
+                            'persistent_volume_claim': {'claim_name': storage.metadata.name},
+                        }
+                    ],
+                },
+            },
+        },
+        opts=k8s_opts,
+    )
+
+    # containerd pulls through the node port on localhost, which is served on every node:
+    k8s.core.v1.Service(
+        name,
+        metadata={'name': name, 'namespace': namespace},
+        spec={
+            'type': 'NodePort',
+            'selector': labels,
+            'ports': [
+                {
+                    'name': 'registry',
+                    'port': 5000,
+                    'target_port': 'registry',
+                    'node_port': mirror_config.node_port,
+                }
+            ],
+        },
+        opts=k8s_opts,
+    )
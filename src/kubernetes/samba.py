@@ -1,10 +1,16 @@
 import pulumi as p
 import pulumi_kubernetes as k8s
 
-from kubernetes.model import ComponentConfig
+from kubernetes.charts import get_chart
+from kubernetes.components import ComponentContext
+from kubernetes.model import SmbShareConfig
 
 
-def ensure_csi_driver_smb(component_config: ComponentConfig, k8s_provider: k8s.Provider):
+def ensure_csi_driver_smb(context: ComponentContext) -> p.Resource:
+    csi_driver_smb_config = context.component_config.csi_driver_smb
+    assert csi_driver_smb_config, 'csi-driver-smb not configured'
+    k8s_provider = context.k8s_provider
+
     ns = k8s.core.v1.Namespace(
         'csi-driver-smb',
         metadata={
@@ -13,23 +19,82 @@ def ensure_csi_driver_smb(component_config: ComponentConfig, k8s_provider: k8s.P
         opts=p.ResourceOptions(provider=k8s_provider),
     )
 
-    namespaced_k8s_provider = k8s.Provider(
+    k8s_opts = p.ResourceOptions(provider=k8s_provider)
+
+    csi_driver_smb = k8s.helm.v3.Release(
         'csi-driver-smb',
-        kubeconfig=k8s_provider.kubeconfig,  # pyright: ignore[reportAttributeAccessIssue]
+        chart=get_chart(
+            'csi-driver-smb',
+            repo='https://raw.githubusercontent.com/kubernetes-csi/csi-driver-smb/master/charts',
+            chart_config=csi_driver_smb_config,
+        ),
         namespace=ns.metadata.name,
+        values={
+            # https://github.com/kubernetes-csi/csi-driver-smb/tree/master/charts#tips
+            'linux': {
+                'kubelet': '/var/snap/microk8s/common/var/lib/kubelet',
+                **(
+                    {'resources': {'smb': csi_driver_smb_config.node_resources.model_dump()}}
+                    if csi_driver_smb_config.node_resources
+                    else {}
+                ),
+            },
+            'controller': {
+                'replicas': csi_driver_smb_config.controller_replicas,
+                **(
+                    {'resources': {'smb': csi_driver_smb_config.controller_resources.model_dump()}}
+                    if csi_driver_smb_config.controller_resources
+                    else {}
+                ),
+            },
+        },
+        opts=k8s_opts,
     )
-    k8s_opts = p.ResourceOptions(provider=namespaced_k8s_provider)
 
-    k8s.helm.v3.Release(
-        'csi-driver-smb',
-        chart='csi-driver-smb',
-        version=component_config.csi_driver_smb.version,
-        repository_opts={
-            'repo': 'https://raw.githubusercontent.com/kubernetes-csi/csi-driver-smb/master/charts'
+    for share_config in csi_driver_smb_config.shares:
+        _create_storage_class(
+            share_config,
+            namespace=ns.metadata.name,
+            k8s_opts=p.ResourceOptions.merge(
+                k8s_opts, p.ResourceOptions(depends_on=[csi_driver_smb])
+            ),
+        )
+
+    return csi_driver_smb
+
+
+def _create_storage_class(
+    share_config: SmbShareConfig,
+    *,
+    namespace: p.Input[str],
+    k8s_opts: p.ResourceOptions,
+):
+    credentials = k8s.core.v1.Secret(
+        f'smb-{share_config.name}-credentials',
+        metadata={'namespace': namespace},
+        type='Opaque',
+        string_data={
+            'username': share_config.username,
+            'password': share_config.password.value,
         },
-        values={
-            # https://github.com/kubernetes-csi/csi-driver-smb/tree/master/charts#tips
-            'linux': {'kubelet': '/var/snap/microk8s/common/var/lib/kubelet'},
+        opts=k8s_opts,
+    )
+
+    k8s.storage.v1.StorageClass(
+        share_config.name,
+        metadata={'name': share_config.name},
+        provisioner='smb.csi.k8s.io',
+        parameters={
+            'source': share_config.source,
+            # credentials for creating the volume directories and for mounting:
+            'csi.storage.k8s.io/provisioner-secret-name': credentials.metadata.name,
+            'csi.storage.k8s.io/provisioner-secret-namespace': namespace,
+            'csi.storage.k8s.io/node-stage-secret-name': credentials.metadata.name,
+            'csi.storage.k8s.io/node-stage-secret-namespace': namespace,
         },
+        mount_options=share_config.mount_options,
+        reclaim_policy=share_config.reclaim_policy,
+        volume_binding_mode='Immediate',
+        allow_volume_expansion=True,
         opts=k8s_opts,
     )
@@ -0,0 +1,15 @@
+"""Scraping of component metrics by the monitoring component, if enabled."""
+
+from kubernetes.model import ComponentConfig
+
+
+def get_scrape_annotations(component_config: ComponentConfig, port: int) -> dict[str, str]:
+    """Return the pod annotations to have metrics scraped, if monitoring is enabled."""
+    if not component_config.is_enabled('monitoring'):
+        return {}
+
+    return {
+        'prometheus.io/scrape': 'true',
+        'prometheus.io/port': str(port),
+        'prometheus.io/path': '/metrics',
+    }
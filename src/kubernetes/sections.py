@@ -0,0 +1,16 @@
+"""Output of remote commands combining several commands, split by section markers."""
+
+# printed on a line of its own, followed by the name of the section:
+SECTION_MARKER = '--- '
+
+
+def split_sections(output: str) -> dict[str, list[str]]:
+    """Return the lines of each section by name, lines before the first marker are dropped."""
+    sections: dict[str, list[str]] = {}
+    lines: list[str] = []
+    for line in output.splitlines():
+        if line.startswith(SECTION_MARKER):
+            lines = sections.setdefault(line.removeprefix(SECTION_MARKER), [])
+        else:
+            lines.append(line)
+    return sections
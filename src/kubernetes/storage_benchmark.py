@@ -0,0 +1,191 @@
+"""Benchmark of the storage classes with fio, run on a fresh volume per storage class and node."""
+
+import json
+import shlex
+import typing
+
+import pulumi as p
+import pulumi_command as command
+import pulumi_kubernetes as k8s
+
+from kubernetes.components import ComponentContext
+from kubernetes.model import StorageBenchmarkConfig
+from kubernetes.sections import SECTION_MARKER, split_sections
+
+# fio read/write modes, by the name used in the results:
+MODES = {
+    'seq-read': 'read',
+    'seq-write': 'write',
+    'rand-read': 'randread',
+    'rand-write': 'randwrite',
+}
+
+
+def ensure_storage_benchmark(context: ComponentContext) -> p.Resource:
+    component_config = context.component_config
+    benchmark_config = component_config.storage_benchmark
+    assert benchmark_config, 'storage benchmark not configured'
+    k8s_opts = p.ResourceOptions(provider=context.k8s_provider)
+
+    ns = k8s.core.v1.Namespace(
+        'storage-benchmark',
+        metadata={
+            'name': 'storage-benchmark',
+        },
+        opts=k8s_opts,
+    )
+
+    node_names = benchmark_config.nodes or [node.name for node in component_config.microk8s.nodes]
+
+    # run one benchmark after the other, so that they do not compete for the same disks:
+    previous: list[p.Resource] = list(context.dependencies.values())
+    jobs: dict[str, k8s.batch.v1.Job] = {}
+    for storage_class in benchmark_config.storage_classes:
+        for node_name in node_names:
+            name = f'fio-{storage_class}-{node_name}'
+            job = _create_benchmark_job(
+                benchmark_config,
+                name,
+                storage_class=storage_class,
+                node_name=node_name,
+                namespace=ns.metadata.name,
+                k8s_opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=previous)),
+            )
+            jobs[f'{storage_class}/{node_name}'] = job
+            previous = [job]
+
+    results = command.remote.Command(
+        'storage-benchmark-results',
+        connection=context.master_connection,
+        add_previous_output_in_env=False,
+        create=p.Output.all(ns.metadata.name, *(job.metadata.name for job in jobs.values())).apply(
+            lambda args: '; '.join(
+                f'echo {shlex.quote(SECTION_MARKER + key)}'
+                f' && microk8s kubectl logs --namespace {args[0]} job/{job_name}'
+                for key, job_name in zip(jobs, args[1:], strict=True)
+            )
+        ),
+        logging=command.remote.Logging.STDERR,
+        triggers=[job.metadata.uid for job in jobs.values()],
+        opts=p.ResourceOptions(depends_on=list(jobs.values())),
+    )
+
+    p.export('storage-benchmark', results.stdout.apply(parse_benchmark_results))
+
+    return results
+
+
+def _create_benchmark_job(
+    benchmark_config: StorageBenchmarkConfig,
+    name: str,
+    *,
+    storage_class: str,
+    node_name: str,
+    namespace: p.Input[str],
+    k8s_opts: p.ResourceOptions,
+) -> k8s.batch.v1.Job:
+    # a fresh volume for every run, as the old one still holds the previous run's test files:
+    volume = k8s.core.v1.PersistentVolumeClaim(
+        f'{name}-run-{benchmark_config.run}',
+        metadata={
+            'namespace': namespace,
+            # volume binds only once the benchmark pod is scheduled:
+            'annotations': {'pulumi.com/skipAwait': 'true'},
+        },
+        spec={
+            'access_modes': ['ReadWriteOnce'],
+            'storage_class_name': storage_class,
+            # room for the test file and file system overhead:
+            'resources': {'requests': {'storage': f'{benchmark_config.size_gb + 1}Gi'}},
+        },
+        opts=k8s_opts,
+    )
+
+    return k8s.batch.v1.Job(
+        name,
+        metadata={'namespace': namespace},
+        spec={
+            'backoff_limit': 0,
+            'template': {
+                'metadata': {
+                    # replaces the job and hence runs the benchmark again:
+                    'annotations': {'storage-benchmark-run': str(benchmark_config.run)},
+                },
+                'spec': {
+                    'restart_policy': 'Never',
+                    'node_selector': {'kubernetes.io/hostname': node_name},
+                    'containers': [
+                        {
+                            'name': 'fio',
+                            'image': benchmark_config.image,
+                            'command': ['fio', *_get_fio_args(benchmark_config)],
+                            'volume_mounts': [{'name': 'data', 'mount_path': '/data'}],
+                        }
+                    ],
+                    'volumes': [
+                        {
+                            'name': 'data',
+                            'persistent_volume_claim': {'claim_name': volume.metadata.name},
+                        }
+                    ],
+                },
+            },
+        },
+        opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(delete_before_replace=True)),
+    )
+
+
+def _get_fio_args(benchmark_config: StorageBenchmarkConfig) -> list[str]:
+    fio_args = [
+        '--output-format=json',
+        '--directory=/data',
+        f'--size={benchmark_config.size_gb}G',
+        f'--runtime={benchmark_config.runtime_s}',
+        '--time_based',
+        '--ioengine=libaio',
+        f'--iodepth={benchmark_config.iodepth}',
+        f'--direct={int(benchmark_config.direct)}',
+        '--group_reporting',
+    ]
+    for block_size in benchmark_config.block_sizes:
+        for mode, rw in MODES.items():
+            # stonewall runs the jobs one after the other instead of in parallel:
+            fio_args += [
+                f'--name={mode}-{block_size}',
+                f'--rw={rw}',
+                f'--bs={block_size}',
+                '--stonewall',
+            ]
+
+    return fio_args
+
+
+def parse_benchmark_results(output: str) -> dict[str, dict[str, typing.Any]]:
+    """Return the results by storage class, node and fio job."""
+    results: dict[str, dict[str, typing.Any]] = {}
+    for key, section_lines in split_sections(output).items():
+        storage_class, _, node_name = key.partition('/')
+        try:
+            fio_results = json.loads('\n'.join(section_lines))
+        except json.JSONDecodeError:
+            p.log.warn(f'no fio results of storage class {storage_class} on {node_name}')
+            continue
+
+        results.setdefault(storage_class, {})[node_name] = {
+            job['jobname']: _summarize_job(job) for job in fio_results['jobs']
+        }
+
+    return results
+
+
+def _summarize_job(job: dict[str, typing.Any]) -> dict[str, float]:
+    # a job either reads or writes:
+    stats = job['read'] if job['read']['io_bytes'] else job['write']
+    return {
+        'iops': round(stats['iops']),
+        'bandwidth_mib_s': round(stats['bw'] / 1024, 1),
+        'latency_mean_ms': round(stats['lat_ns']['mean'] / 1e6, 3),
+        'latency_p99_ms': round(
+            stats.get('clat_ns', {}).get('percentile', {}).get('99.000000', 0) / 1e6, 3
+        ),
+    }
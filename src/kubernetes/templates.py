@@ -0,0 +1,17 @@
+"""Jinja templates of the assets, rendered into cloud-configs and component configs."""
+
+import functools
+import pathlib
+
+import jinja2
+
+
+@functools.cache
+def load_template(directory: str, name: str) -> jinja2.Template:
+    """Return the template `assets/<directory>/<name>`."""
+    return jinja2.Template(
+        pathlib.Path(f'assets/{directory}/{name}').read_text(),
+        undefined=jinja2.StrictUndefined,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
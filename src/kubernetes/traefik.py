@@ -1,22 +1,25 @@
 """Installation of traefik ingress controller."""
 
-import os
+import typing
 
 import pulumi as p
 import pulumi_kubernetes as k8s
 
-from mp.deploy_utils import unify
+from kubernetes.charts import get_chart
+from kubernetes.components import ComponentContext
+from kubernetes.model import TraefikConfig
+from kubernetes.scraping import get_scrape_annotations
 
-from kubernetes.model import ComponentConfig
+METRICS_PORT = 9100
 
 
-def ensure_traefik(
-    component_config: ComponentConfig,
-    *,
-    metallb: p.Resource,
-    cert_manager: p.Resource,
-    k8s_provider: k8s.Provider,
-):
+def ensure_traefik(context: ComponentContext) -> p.Resource:
+    component_config = context.component_config
+    traefik_config = component_config.traefik
+    metallb_config = component_config.metallb
+    assert traefik_config and metallb_config, 'traefik not configured'
+    k8s_provider = context.k8s_provider
+
     ns = k8s.core.v1.Namespace(
         'traefik',
         metadata={
@@ -25,27 +28,43 @@ def ensure_traefik(
         opts=p.ResourceOptions(provider=k8s_provider),
     )
 
-    namespaced_k8s_provider = k8s.Provider(
-        'traefik-provider',
-        kubeconfig=k8s_provider.kubeconfig,  # pyright: ignore[reportAttributeAccessIssue]
-        namespace=ns.metadata['name'],
-    )
-    k8s_opts = p.ResourceOptions(provider=namespaced_k8s_provider)
+    k8s_opts = p.ResourceOptions(provider=k8s_provider)
 
     traefik = k8s.helm.v3.Release(
         'traefik',
-        chart='traefik',
-        version=component_config.traefik.version,
-        repository_opts={'repo': 'https://traefik.github.io/charts'},
+        chart=get_chart(
+            'traefik',
+            repo='https://traefik.github.io/charts',
+            chart_config=traefik_config,
+        ),
+        namespace=ns.metadata.name,
         values={
             'additionalArguments': [
                 # expose the API directly from the pod to allow getting access to dashboard at
                 # http://localhost:8080/ after kubectl port-forwarding:
                 '--api.insecure=true',
-            ]
+            ],
+            'deployment': {
+                # ignored by the chart if autoscaling is enabled:
+                'replicas': traefik_config.replicas,
+                'podAnnotations': get_scrape_annotations(component_config, METRICS_PORT),
+            },
+            'ports': {'metrics': {'port': METRICS_PORT}},
+            'metrics': {
+                'prometheus': {
+                    'entryPoint': 'metrics',
+                    'addEntryPointsLabels': True,
+                    'addServicesLabels': True,
+                    # finer than the default buckets, to get useful latency percentiles:
+                    'buckets': '0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5',
+                },
+            },
+            **_get_scaling_values(traefik_config, address_pool=metallb_config.get_pools()[0].name),
         },
         # depend on metallb to ensure the service gets a public IP queried below:
-        opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[metallb])),
+        opts=p.ResourceOptions.merge(
+            k8s_opts, p.ResourceOptions(depends_on=[context.dependencies['metallb']])
+        ),
     )
 
     service = k8s.core.v1.Service.get(
@@ -67,6 +86,7 @@ def ensure_traefik(
             kind='Certificate',
             metadata={
                 'name': 'certificate',
+                'namespace': ns.metadata.name,
                 'annotations': {
                     # wait for certificate to be issued before starting deployment (and hence application
                     # containers):
@@ -81,7 +101,9 @@ def ensure_traefik(
                     'name': 'lets-encrypt',
                 },
             },
-            opts=p.ResourceOptions.merge(k8s_opts, p.ResourceOptions(depends_on=[cert_manager])),
+            opts=p.ResourceOptions.merge(
+                k8s_opts, p.ResourceOptions(depends_on=[context.dependencies['cert_manager']])
+            ),
         )
 
         # use this certificate as traefik's new default:
@@ -89,7 +111,7 @@ def ensure_traefik(
             'default',
             api_version='traefik.io/v1alpha1',
             kind='TLSStore',
-            metadata={'name': 'default'},
+            metadata={'name': 'default', 'namespace': ns.metadata.name},
             spec={
                 'defaultCertificate': {
                     'secretName': certificate.metadata['name'],  # pyright: ignore[reportAttributeAccessIssue]
@@ -99,15 +121,56 @@ def ensure_traefik(
         )
 
         # create wildcard DNS record:
-        dns_provider = unify.UnifyDnsRecordProvider(
-            base_url=str(component_config.unify.url),
-            api_token=os.environ['UNIFY_API_TOKEN__PULUMI'],
-            verify_ssl=component_config.unify.verify_ssl,
-        )
+        context.dns_records.add(wildcard_domain, ipv4)
 
-        unify.UnifyDnsRecord(
-            'traefik-dns',
-            domain_name=wildcard_domain,
-            ipv4=ipv4,
-            provider=dns_provider,
-        )
+    return traefik
+
+
+def _get_scaling_values(
+    traefik_config: TraefikConfig, *, address_pool: str
+) -> dict[str, typing.Any]:
+    autoscaling = traefik_config.autoscaling
+    return {
+        'autoscaling': (
+            {
+                'enabled': True,
+                'minReplicas': autoscaling.min_replicas,
+                'maxReplicas': autoscaling.max_replicas,
+                'metrics': [
+                    {
+                        'type': 'Resource',
+                        'resource': {
+                            'name': 'cpu',
+                            'target': {
+                                'type': 'Utilization',
+                                'averageUtilization': autoscaling.target_cpu_utilization_percent,
+                            },
+                        },
+                    }
+                ],
+            }
+            if autoscaling
+            else {'enabled': False}
+        ),
+        'podDisruptionBudget': {
+            'enabled': True,
+            'maxUnavailable': traefik_config.max_unavailable,
+        },
+        # spread pods across nodes, so that ingress capacity grows with the number of nodes:
+        'topologySpreadConstraints': [
+            {
+                'maxSkew': 1,
+                'topologyKey': 'kubernetes.io/hostname',
+                'whenUnsatisfiable': 'ScheduleAnyway',
+                'labelSelector': {'matchLabels': {'app.kubernetes.io/name': 'traefik'}},
+            }
+        ],
+        'resources': traefik_config.resources.model_dump(),
+        'service': {
+            # with several pools, take the IP from the one announced as configured for ingress:
+            'annotations': {'metallb.universe.tf/address-pool': address_pool},
+            'spec': {
+                'externalTrafficPolicy': traefik_config.external_traffic_policy,
+            },
+        },
+    }